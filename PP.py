@@ -1,16 +1,34 @@
-import folium
-import matplotlib.pyplot as plt
+from concurrent.futures import wait
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import seaborn as sns
 import streamlit as st
-
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import MinMaxScaler
-from streamlit_folium import folium_static
+import streamlit.components.v1 as components
+
+# Copy-on-write: las columnas derivadas y los subconjuntos comparten memoria hasta que se modifican
+pd.set_option('mode.copy_on_write', True)
+
+import agregados
+import caracteristicas
+import ajuste
+import coordinador
+import correlacion
+import datos
+import distribuciones
+import espacial
+import graficos
+import ingesta
+import instrumentacion
+import mapa
+import modelo
+import particiones
+import preprocesamiento
+import registro
+import series
+
+# Medición opcional de cada sección (?perfil=1 o ?perfil=memoria en la URL, o PP_PERFIL en el entorno)
+perfil = instrumentacion.Perfil(instrumentacion.modo(st.query_params.to_dict()))
 
 # Título y descripción de la aplicación
 st.title('Modelo de Random Forest para Pesca Artesanal en Coishco')
@@ -18,8 +36,24 @@ st.write("""
 Esta aplicación permite visualizar la importancia de las características en un modelo de Random Forest para la predicción del volumen de captura.
 """)
 
-# Cargar los datos
-df = pd.read_excel('data.xlsx')
+perfil.marcar('Carga de datos')
+
+# Cargar los datos (copia columnar en caché, se regenera solo si cambia el archivo de origen).
+# Todas las sesiones comparten el mismo DataFrame; cada una trabaja sobre una copia superficial
+# y, con copy-on-write, las columnas nuevas o modificadas no tocan los datos compartidos
+@st.cache_resource
+def obtener_datos(version):
+    return datos.cargar_datos()
+
+df = obtener_datos(datos.version_datos()).copy(deep=False)
+
+# Posiciones de las filas de cada especie y embarcación (se construye una vez por versión de los
+# datos); sirve también para los datos normalizados, que conservan las filas y su orden
+@st.cache_resource
+def obtener_particiones(version):
+    return particiones.construir_indice(df)
+
+indice_particiones = obtener_particiones(datos.version_datos())
 
 st.write("### Vista previa de los datos")
 st.write(df.head())
@@ -28,90 +62,142 @@ st.write("""
 Comencemos visualizando algunos gráficos estadisticos referentes a la actividad pesquera de la zona
 """)
 
-# Agrupar por especie y aparejo, sumando los kilos
-df_agrupado_kilos = df.groupby(['Especie', 'Aparejo'])['Volumen_Kg'].sum().unstack()
-
-# Ordenar los datos por la suma total de kilos para cada especie (de menor a mayor)
-df_agrupado_kilos = df_agrupado_kilos.loc[df_agrupado_kilos.sum(axis=1).sort_values().index]
-
-# Seleccionar el tipo de gráfico para los kilos
-opcion_kilos = st.radio("Selecciona el tipo de gráfico para visualizar la distribución de la captura", ('Escala Normal', 'Escala Logarítmica'), key='kilos')
-
-# Crear el gráfico interactivo con Plotly
-if opcion_kilos == 'Escala Normal':
-    st.subheader('Captura total por especie')
-    fig = px.bar(df_agrupado_kilos, 
-                 title='Captura total por especie',
-                 labels={'value': 'Kilos', 'index': 'Especie'},
-                 text_auto=True)
-    fig.update_layout(yaxis_title='Kilos', xaxis_title='Especie', xaxis_tickangle=-45)
-else:
-    st.subheader('Captura total por especie (Escala Logarítmica)')
-    fig = px.bar(df_agrupado_kilos, 
-                 title='Captura total por especie (Escala Logarítmica)',
-                 labels={'value': 'Kilos', 'index': 'Especie'},
-                 log_y=True,
-                 text_auto=True)
-    fig.update_layout(yaxis_title='Kilos (Logarítmico)', xaxis_title='Especie', xaxis_tickangle=-45)
+perfil.marcar('Agregados', filas=len(df))
 
-# Mostrar el gráfico en Streamlit
-st.plotly_chart(fig)
+# Agregados del tablero guardados en disco: con filas nuevas al final del registro solo se suman
+# esas filas, no todo el historial
+@st.cache_resource
+def obtener_agregados(version):
+    return ingesta.actualizar_agregados(df)
 
-# Agrupar los datos por 'Especie' y sumar las ganancias
-ventas_por_especie = df.groupby('Especie')['Ganancia'].sum().sort_values()
-
-# Convertir el resultado en un DataFrame para Plotly
-df_ventas = ventas_por_especie.reset_index()
-df_ventas.columns = ['Especie', 'Ganancia']
-
-# Seleccionar el tipo de gráfico para las ganancias
-opcion_ganancia = st.radio("Selecciona el tipo de gráfico para visualizar las ganancias según la especie", ('Escala Normal', 'Escala Logarítmica'), key='escala_ganancia')
-
-# Crear el gráfico interactivo con Plotly
-if opcion_ganancia == 'Escala Normal':
-    fig = px.bar(df_ventas, 
-                 x='Especie', 
-                 y='Ganancia', 
-                 title='Ganancia por Especie (Escala Normal)', 
-                 labels={'Ganancia': 'Ganancia (Suma Total)', 'Especie': 'Especie'},
-                 color='Ganancia',
-                 text='Ganancia')
-    fig.update_layout(xaxis_title='Especie', yaxis_title='Ganancia (Suma Total)', xaxis_tickangle=-45)
-else:
-    fig = px.bar(df_ventas, 
-                 x='Especie', 
-                 y='Ganancia', 
-                 title='Ganancia por Especie (Escala Logarítmica)', 
-                 labels={'Ganancia': 'Ganancia (Suma Total)', 'Especie': 'Especie'},
-                 color='Ganancia',
-                 text='Ganancia',
-                 log_y=True)
-    fig.update_layout(xaxis_title='Especie', yaxis_title='Ganancia (Suma Total) (Logarítmica)', xaxis_tickangle=-45)
+agregados_tablero = obtener_agregados(datos.version_datos())
 
-# Mostrar el gráfico en Streamlit
-st.plotly_chart(fig)
+# Calcular todas las agregaciones del tablero a partir de un cubo de sumas precalculado
+@st.cache_data
+def obtener_vistas(version):
+    return agregados.vistas(agregados_tablero['cubo'])
 
-# Selección de la especie
-especie_seleccionada = st.selectbox('Selecciona la especie', df['Especie'].unique())
+vistas = obtener_vistas(datos.version_datos())
 
-# Filtrar los datos según la especie seleccionada
-df_filtrado = df[df['Especie'] == especie_seleccionada]
+perfil.marcar('Captura y ganancia por especie')
 
-# Crear el gráfico de barras utilizando matplotlib
-fig, ax = plt.subplots(figsize=(10, 6))
+# Cada sección con controles propios es un fragmento: al cambiar uno de sus controles solo se
+# vuelve a ejecutar esa sección, no la normalización, la correlación ni el modelo
+@st.fragment
+def seccion_captura_especie():
+    # Captura por especie y aparejo, ordenada por la suma total de kilos (de menor a mayor)
+    df_agrupado_kilos = vistas['kilos_especie']
 
-# Crear el mapa centrado en la ubicación media
-mapa = folium.Map(location=[df_filtrado['Origen_Latitud'].mean(), df_filtrado['Origen_Longuitud'].mean()], zoom_start=6)
+    # Seleccionar el tipo de gráfico para los kilos
+    opcion_kilos = st.radio("Selecciona el tipo de gráfico para visualizar la distribución de la captura", ('Escala Normal', 'Escala Logarítmica'), key='kilos')
+
+    # Crear el gráfico interactivo con Plotly
+    if opcion_kilos == 'Escala Normal':
+        st.subheader('Captura total por especie')
+    else:
+        st.subheader('Captura total por especie (Escala Logarítmica)')
+    fig = graficos.figura_captura_especie(df_agrupado_kilos, log_y=(opcion_kilos == 'Escala Logarítmica'))
+
+    # Mostrar el gráfico en Streamlit
+    st.plotly_chart(fig)
+
+seccion_captura_especie()
+
+# Ganancias por especie (fragmento)
+@st.fragment
+def seccion_ganancia_especie():
+    # Ganancias por especie
+    df_ventas = vistas['ventas_especie']
+
+    # Seleccionar el tipo de gráfico para las ganancias
+    opcion_ganancia = st.radio("Selecciona el tipo de gráfico para visualizar las ganancias según la especie", ('Escala Normal', 'Escala Logarítmica'), key='escala_ganancia')
+
+    # Crear el gráfico interactivo con Plotly
+    fig = graficos.figura_ganancia_especie(df_ventas, log_y=(opcion_ganancia == 'Escala Logarítmica'))
+
+    # Mostrar el gráfico en Streamlit
+    st.plotly_chart(fig)
+
+seccion_ganancia_especie()
+
+perfil.marcar('Versiones de los datos')
+
+# Pipeline de características y versión de los datos de cada embarcación y especie, una vez por
+# versión de los datos: cada modelo y cada mapa dependen solo de las filas de su selección (sin
+# normalizar), así que las filas nuevas de otras selecciones no obligan a recalcularlos
+@st.cache_resource
+def obtener_versiones_modelo(version):
+    df_ = preprocesamiento.preparar_caracteristicas(df)
+    df_normalized = preprocesamiento.normalizar(df_)
+    pipeline = caracteristicas.obtener_pipeline(df_normalized, registro.huella_datos(df_normalized))
+    return pipeline, registro.versiones_particiones(df_, indice_particiones, registro.huella_esquema(pipeline))
+
+pipeline_modelo, versiones_modelo = obtener_versiones_modelo(datos.version_datos())
+
+perfil.marcar('Mapa')
+
+# Crear el mapa con los orígenes agregados de una especie (el HTML se guarda en caché por especie y
+# versión de sus filas: las faenas nuevas de otras especies no lo invalidan)
+@st.cache_data(max_entries=64)
+def obtener_mapa(especie, version):
+    # Filtrar los datos según la especie seleccionada
+    return mapa.html_mapa(particiones.seleccionar(df, indice_particiones, 'Especie', especie))
+
+# Mapa de la especie seleccionada (fragmento)
+@st.fragment
+def seccion_mapa():
+    # Selección de la especie
+    especie_seleccionada = st.selectbox('Selecciona la especie', particiones.valores(indice_particiones, 'Especie'))
+
+    # Mostrar el mapa en Streamlit
+    components.html(obtener_mapa(especie_seleccionada, versiones_modelo[('Especie', especie_seleccionada)]), height=510, width=700)
+
+seccion_mapa()
+
+perfil.marcar('Zonas de pesca')
+
+# Índice espacial: sumas por celda de la rejilla de todas las especies y embarcaciones (guardado
+# con los agregados del tablero; las faenas nuevas se suman a sus celdas)
+@st.cache_data(max_entries=64)
+def obtener_mapa_rejilla(celdas, medida, version):
+    return espacial.html_mapa_rejilla(celdas, medida)
+
+indice_espacial = agregados_tablero['indice']
+
+# Zonas de pesca con el área a consultar (fragmento)
+@st.fragment
+def seccion_zonas():
+    st.subheader('Zonas de pesca: captura, venta y combustible por celda')
+    celdas = indice_espacial['celdas']
+    if celdas.empty:
+        st.info('No hay coordenadas de origen en los datos.')
+        return
+
+    medida = st.radio('Selecciona la medida del mapa de zonas:', espacial.MEDIDAS, key='medida_zonas', horizontal=True)
+    tam_celda = indice_espacial['tam_celda']
+    lat = (float(celdas['Latitud'].min() - tam_celda), float(celdas['Latitud'].max() + tam_celda))
+    lon = (float(celdas['Longitud'].min() - tam_celda), float(celdas['Longitud'].max() + tam_celda))
+    lat_min, lat_max = st.slider('Latitud', lat[0], lat[1], lat, step=tam_celda / 5, key='latitud_zonas')
+    lon_min, lon_max = st.slider('Longitud', lon[0], lon[1], lon, step=tam_celda / 5, key='longitud_zonas')
+
+    # Totales del área con la tabla de sumas acumuladas (tiempo constante)
+    total = espacial.totales(indice_espacial, lat_min, lat_max, lon_min, lon_max)
+    columnas = st.columns(4)
+    columnas[0].metric('Faenas', f"{total['Faenas']:,.0f}")
+    columnas[1].metric('Volumen (kg)', f"{total['Volumen_Kg']:,.0f}")
+    columnas[2].metric('Venta (S/)', f"{total['Venta']:,.2f}")
+    columnas[3].metric('Combustible (S/)', f"{total['Costo_Combustible']:,.2f}")
+
+    # Una celda coloreada por la suma de la medida en lugar de un punto por faena
+    celdas_area = espacial.celdas_en(indice_espacial, lat_min, lat_max, lon_min, lon_max)
+    if celdas_area.empty:
+        st.info('No hay faenas en el área seleccionada.')
+    else:
+        components.html(obtener_mapa_rejilla(celdas_area, medida, datos.version_datos()), height=510, width=700)
 
-# Añadir marcadores al mapa
-for idx, row in df_filtrado.iterrows():
-    folium.Marker(
-        location=[row['Origen_Latitud'], row['Origen_Longuitud']],
-        popup=row['Origen']
-    ).add_to(mapa)
+seccion_zonas()
 
-# Mostrar el mapa en Streamlit
-folium_static(mapa)
+perfil.marcar('Histogramas de precio, talla y millas', filas=len(df))
 
 # Título de la aplicación
 st.title('Distribución de Precio por Kg ponderada por Volumen en Kg')
@@ -164,333 +250,334 @@ fig.update_layout(xaxis_title='Millas Recorridas',
 # Mostrar el gráfico en Streamlit
 st.plotly_chart(fig)
 
-# Agrupar por Marca de Motor y Caballos de fuerza, sumando los kilos
-df_agrupado = df.groupby(['Marca_Motor', 'Caballos_Motor'])['Volumen_Kg'].sum().unstack()
-
-# Convertir el DataFrame a formato largo para Plotly
-df_agrupado_long = df_agrupado.reset_index().melt(id_vars='Marca_Motor', var_name='Caballos_Motor', value_name='Volumen_Kg')
-
-# Crear el selector de gráficos
-opcion = st.radio('Selecciona el tipo de gráfico para captura por caballos de motor:', ['Escala Normal', 'Escala Logarítmica'])
-
-# Crear el gráfico interactivo con Plotly
-if opcion == 'Escala Normal':
-    st.subheader('Captura total por caballos de motor')
-    fig = px.bar(df_agrupado_long, 
-                 x='Marca_Motor', 
-                 y='Volumen_Kg', 
-                 color='Caballos_Motor', 
-                 title='Captura total por Motor y Caballos de fuerza',
-                 labels={'Marca_Motor': 'Motor', 'Volumen_Kg': 'Kilos'},
-                 color_continuous_scale='viridis',
-                 text='Volumen_Kg')
-    fig.update_layout(xaxis_title='Motor', yaxis_title='Kilos', xaxis_tickangle=-45)
-else:
-    st.subheader('Captura total por caballos de motor (Escala Logarítmica)')
-    fig = px.bar(df_agrupado_long, 
-                 x='Marca_Motor', 
-                 y='Volumen_Kg', 
-                 color='Caballos_Motor', 
-                 title='Captura total por caballos de motor (Escala Logarítmica)',
-                 labels={'Marca_Motor': 'Motor', 'Volumen_Kg': 'Kilos'},
-                 color_continuous_scale='viridis',
-                 text='Volumen_Kg',
-                 log_y=True)
-    fig.update_layout(xaxis_title='Motor', yaxis_title='Kilos (Logarítmico)', xaxis_tickangle=-45)
-
-# Mostrar el gráfico en Streamlit
-st.plotly_chart(fig)
-
-# Agrupar los datos
-ventas_por_embarcacion = df.groupby('Embarcacion')['Ganancia'].sum()
-millas_por_embarcacion = df.groupby('Embarcacion')['Millas_Recorridas'].sum()
-volumen_por_embarcacion = df.groupby('Embarcacion')['Volumen_Kg'].sum()
-
-# Crear un DataFrame combinado
-datos_combinados = pd.DataFrame({
-    'Ganancia': ventas_por_embarcacion,
-    'Millas Recorridas': millas_por_embarcacion,
-    'Volumen de Capturas': volumen_por_embarcacion
-})
-
-# Convertir el DataFrame combinado a formato largo para Plotly
-datos_combinados_long = datos_combinados.reset_index().melt(id_vars='Embarcacion', var_name='Métrica', value_name='Valor')
-
-# Crear botones para seleccionar el gráfico
-opcion = st.radio('Selecciona el tipo de gráfico:', 
-                  ['Ganancia por Embarcación', 
-                   'Millas Recorridas por Embarcación', 
-                   'Volumen de Capturas por Embarcación',
-                   'Barras Apiladas: Ganancia, Millas, Volumen'])
-
-# Mostrar el gráfico correspondiente
-if opcion == 'Ganancia por Embarcación':
-    st.subheader('Ganancia por Embarcación')
-    fig = px.bar(ventas_por_embarcacion.reset_index(), 
-                 x='Embarcacion', 
-                 y='Ganancia', 
-                 title='Ganancia por Embarcación',
-                 labels={'Ganancia': 'Ganancia', 'Embarcacion': 'Embarcación'},
-                 color='Ganancia',
-                 text='Ganancia')
-    fig.update_layout(xaxis_title='Embarcación', yaxis_title='Ganancia', xaxis_tickangle=-45)
-
-elif opcion == 'Millas Recorridas por Embarcación':
-    st.subheader('Millas Recorridas por Embarcación')
-    fig = px.bar(millas_por_embarcacion.reset_index(), 
-                 x='Embarcacion', 
-                 y='Millas_Recorridas', 
-                 title='Millas Recorridas por Embarcación',
-                 labels={'Millas_Recorridas': 'Millas Recorridas', 'Embarcacion': 'Embarcación'},
-                 color='Millas_Recorridas',
-                 text='Millas_Recorridas')
-    fig.update_layout(xaxis_title='Embarcación', yaxis_title='Millas Recorridas', xaxis_tickangle=-45)
-
-elif opcion == 'Volumen de Capturas por Embarcación':
-    st.subheader('Volumen de Capturas por Embarcación')
-    fig = px.bar(volumen_por_embarcacion.reset_index(), 
-                 x='Embarcacion', 
-                 y='Volumen_Kg', 
-                 title='Volumen de Capturas por Embarcación',
-                 labels={'Volumen_Kg': 'Volumen (Kg)', 'Embarcacion': 'Embarcación'},
-                 color='Volumen_Kg',
-                 text='Volumen_Kg')
-    fig.update_layout(xaxis_title='Embarcación', yaxis_title='Volumen (Kg)', xaxis_tickangle=-45)
-
-elif opcion == 'Barras Apiladas: Ganancia, Millas, Volumen':
-    st.subheader('Barras Apiladas: Ganancia, Millas, Volumen por Embarcación')
-    fig = px.bar(datos_combinados_long, 
-                 x='Embarcacion', 
-                 y='Valor', 
-                 color='Métrica', 
-                 title='Barras Apiladas: Ganancia, Millas, Volumen por Embarcación',
-                 labels={'Valor': 'Valores', 'Embarcacion': 'Embarcación'},
-                 text='Valor')
-    fig.update_layout(xaxis_title='Embarcación', yaxis_title='Valores', xaxis_tickangle=-45)
-
-# Mostrar el gráfico en Streamlit
-st.plotly_chart(fig)
-
-# Agrupar las ganancias por fecha de faena
-df_agrupado = df.groupby('Inicio_Faena')['Ganancia'].sum().reset_index()
-
-# Crear el gráfico interactivo con Plotly
-st.subheader('Distribución de ganancias por Fecha de Faena')
-fig = px.line(df_agrupado, 
-              x='Inicio_Faena', 
-              y='Ganancia', 
-              title='Distribución de Ganancias por Fecha de Faena',
-              labels={'Inicio_Faena': 'Fecha de Faena', 'Ganancia': 'Ganancia'},
-              markers=True)
-
-# Personalizar el gráfico
-fig.update_layout(xaxis_title='Fecha de Faena', yaxis_title='Ganancia', xaxis_tickformat='%Y-%m-%d')
-
-# Mostrar el gráfico en Streamlit
-st.plotly_chart(fig)
-
-# Agrupar las ganancias por fecha de faena
-df_agrupado = df.groupby('Inicio_Faena')['Costo_Combustible'].sum().reset_index()
-
-# Crear el gráfico interactivo con Plotly
-st.subheader('Distribución de Costo Combustible por Fecha de Faena')
-fig = px.line(df_agrupado, 
-              x='Inicio_Faena', 
-              y='Costo_Combustible', 
-              title='Distribución de Costo Combustible por Fecha de Faena',
-              labels={'Inicio_Faena': 'Fecha de Faena', 'Costo_Combustible': 'Costo_Combustible'},
-              markers=True)
-
-# Personalizar el gráfico
-fig.update_layout(xaxis_title='Fecha de Faena', yaxis_title='Costo Combustible', xaxis_tickformat='%Y-%m-%d')
+perfil.marcar('Captura por motor')
+
+# Captura por motor (fragmento)
+@st.fragment
+def seccion_motor():
+    # Captura por Marca de Motor y Caballos de fuerza, en formato largo para Plotly
+    df_agrupado_long = vistas['motor_long']
+
+    # Crear el selector de gráficos
+    opcion = st.radio('Selecciona el tipo de gráfico para captura por caballos de motor:', ['Escala Normal', 'Escala Logarítmica'])
+
+    # Crear el gráfico interactivo con Plotly
+    if opcion == 'Escala Normal':
+        st.subheader('Captura total por caballos de motor')
+        fig = px.bar(df_agrupado_long, 
+                     x='Marca_Motor', 
+                     y='Volumen_Kg', 
+                     color='Caballos_Motor', 
+                     title='Captura total por Motor y Caballos de fuerza',
+                     labels={'Marca_Motor': 'Motor', 'Volumen_Kg': 'Kilos'},
+                     color_continuous_scale='viridis',
+                     text='Volumen_Kg')
+        fig.update_layout(xaxis_title='Motor', yaxis_title='Kilos', xaxis_tickangle=-45)
+    else:
+        st.subheader('Captura total por caballos de motor (Escala Logarítmica)')
+        fig = px.bar(df_agrupado_long, 
+                     x='Marca_Motor', 
+                     y='Volumen_Kg', 
+                     color='Caballos_Motor', 
+                     title='Captura total por caballos de motor (Escala Logarítmica)',
+                     labels={'Marca_Motor': 'Motor', 'Volumen_Kg': 'Kilos'},
+                     color_continuous_scale='viridis',
+                     text='Volumen_Kg',
+                     log_y=True)
+        fig.update_layout(xaxis_title='Motor', yaxis_title='Kilos (Logarítmico)', xaxis_tickangle=-45)
+
+    # Mostrar el gráfico en Streamlit
+    st.plotly_chart(fig)
+
+seccion_motor()
+
+perfil.marcar('Gráficos por embarcación')
+
+# Gráficos por embarcación (fragmento)
+@st.fragment
+def seccion_embarcacion():
+    # Ganancia, millas y volumen por embarcación
+    ventas_por_embarcacion = vistas['ganancia_embarcacion']
+    millas_por_embarcacion = vistas['millas_embarcacion']
+    volumen_por_embarcacion = vistas['volumen_embarcacion']
+
+    # DataFrame combinado en formato largo para Plotly
+    datos_combinados_long = vistas['embarcacion_long']
+
+    # Crear botones para seleccionar el gráfico
+    opcion = st.radio('Selecciona el tipo de gráfico:', 
+                      ['Ganancia por Embarcación', 
+                       'Millas Recorridas por Embarcación', 
+                       'Volumen de Capturas por Embarcación',
+                       'Barras Apiladas: Ganancia, Millas, Volumen'])
+
+    # Mostrar el gráfico correspondiente
+    if opcion == 'Ganancia por Embarcación':
+        st.subheader('Ganancia por Embarcación')
+        fig = px.bar(ventas_por_embarcacion.reset_index(), 
+                     x='Embarcacion', 
+                     y='Ganancia', 
+                     title='Ganancia por Embarcación',
+                     labels={'Ganancia': 'Ganancia', 'Embarcacion': 'Embarcación'},
+                     color='Ganancia',
+                     text='Ganancia')
+        fig.update_layout(xaxis_title='Embarcación', yaxis_title='Ganancia', xaxis_tickangle=-45)
+
+    elif opcion == 'Millas Recorridas por Embarcación':
+        st.subheader('Millas Recorridas por Embarcación')
+        fig = px.bar(millas_por_embarcacion.reset_index(), 
+                     x='Embarcacion', 
+                     y='Millas_Recorridas', 
+                     title='Millas Recorridas por Embarcación',
+                     labels={'Millas_Recorridas': 'Millas Recorridas', 'Embarcacion': 'Embarcación'},
+                     color='Millas_Recorridas',
+                     text='Millas_Recorridas')
+        fig.update_layout(xaxis_title='Embarcación', yaxis_title='Millas Recorridas', xaxis_tickangle=-45)
+
+    elif opcion == 'Volumen de Capturas por Embarcación':
+        st.subheader('Volumen de Capturas por Embarcación')
+        fig = px.bar(volumen_por_embarcacion.reset_index(), 
+                     x='Embarcacion', 
+                     y='Volumen_Kg', 
+                     title='Volumen de Capturas por Embarcación',
+                     labels={'Volumen_Kg': 'Volumen (Kg)', 'Embarcacion': 'Embarcación'},
+                     color='Volumen_Kg',
+                     text='Volumen_Kg')
+        fig.update_layout(xaxis_title='Embarcación', yaxis_title='Volumen (Kg)', xaxis_tickangle=-45)
+
+    elif opcion == 'Barras Apiladas: Ganancia, Millas, Volumen':
+        st.subheader('Barras Apiladas: Ganancia, Millas, Volumen por Embarcación')
+        fig = px.bar(datos_combinados_long, 
+                     x='Embarcacion', 
+                     y='Valor', 
+                     color='Métrica', 
+                     title='Barras Apiladas: Ganancia, Millas, Volumen por Embarcación',
+                     labels={'Valor': 'Valores', 'Embarcacion': 'Embarcación'},
+                     text='Valor')
+        fig.update_layout(xaxis_title='Embarcación', yaxis_title='Valores', xaxis_tickangle=-45)
+
+    # Mostrar el gráfico en Streamlit
+    st.plotly_chart(fig)
+
+seccion_embarcacion()
+
+perfil.marcar('Series por fecha de faena')
+
+# Series por fecha de faena (fragmento)
+@st.fragment
+def seccion_series():
+    # Seleccionar la frecuencia de las series por fecha de faena
+    frecuencia = st.radio('Selecciona la frecuencia de las series por fecha de faena:', list(series.FRECUENCIAS), key='frecuencia_faena', horizontal=True)
+
+    # Ganancias por fecha de faena (remuestreadas y reducidas a un número acotado de puntos)
+    df_agrupado = series.serie_para_grafico(vistas['ganancia_fecha'], 'Ganancia', frecuencia)
+
+    # Crear el gráfico interactivo con Plotly
+    st.subheader('Distribución de ganancias por Fecha de Faena')
+    fig = px.line(df_agrupado, 
+                  x='Inicio_Faena', 
+                  y='Ganancia', 
+                  title='Distribución de Ganancias por Fecha de Faena',
+                  labels={'Inicio_Faena': 'Fecha de Faena', 'Ganancia': 'Ganancia'},
+                  markers=True)
+
+    # Personalizar el gráfico
+    fig.update_layout(xaxis_title='Fecha de Faena', yaxis_title='Ganancia', xaxis_tickformat='%Y-%m-%d')
+
+    # Mostrar el gráfico en Streamlit
+    st.plotly_chart(fig)
+
+    # Costo de combustible por fecha de faena
+    df_agrupado = series.serie_para_grafico(vistas['combustible_fecha'], 'Costo_Combustible', frecuencia)
+
+    # Crear el gráfico interactivo con Plotly
+    st.subheader('Distribución de Costo Combustible por Fecha de Faena')
+    fig = px.line(df_agrupado, 
+                  x='Inicio_Faena', 
+                  y='Costo_Combustible', 
+                  title='Distribución de Costo Combustible por Fecha de Faena',
+                  labels={'Inicio_Faena': 'Fecha de Faena', 'Costo_Combustible': 'Costo_Combustible'},
+                  markers=True)
+
+    # Personalizar el gráfico
+    fig.update_layout(xaxis_title='Fecha de Faena', yaxis_title='Costo Combustible', xaxis_tickformat='%Y-%m-%d')
+
+    # Mostrar el gráfico en Streamlit
+    st.plotly_chart(fig)
+
+seccion_series()
+
+perfil.marcar('Características', filas=len(df))
+
+# Crear las características derivadas de fechas, horas, precios y tallas
+df = preprocesamiento.agregar_caracteristicas(df)
 
-# Mostrar el gráfico en Streamlit
-st.plotly_chart(fig)
+# Crear un nuevo DataFrame eliminando las columnas datatime
+df_ = preprocesamiento.eliminar_fechas(df)
 
-# Convertir la columna 'Inicio_Faena' y 'Fecha_Venta' a datetime
-df['Inicio_Faena'] = pd.to_datetime(df['Inicio_Faena'], format='%d %m %Y %H:%M')
-df['Inicio_Venta'] = pd.to_datetime(df['Inicio_Venta'], format='%d %m %Y %H:%M')
-
-# Transformar las columnas 'Inicio_Faena' y 'Inicio_Venta' en valores flotantes (hora + minutos/60)
-df['HFloat_Faena'] = df['Inicio_Faena'].dt.hour + df['Inicio_Faena'].dt.minute / 60
-df['HFloat_Venta'] = df['Inicio_Venta'].dt.hour + df['Inicio_Venta'].dt.minute / 60
-
-# Función para categorizar la hora en intervalos de 2 horas considerando A.M. y P.M.
-def categorize_hour(hour):
-    period = "A.M." if hour < 12 else "P.M."
-    hour_12 = hour % 12
-    hour_12 = 12 if hour_12 == 0 else hour_12
-    start_hour = hour_12
-    end_hour = (hour_12 + 2) % 12
-    end_hour = 12 if end_hour == 0 else end_hour
-    return f"{start_hour:02d} - {end_hour:02d} {period}"
-
-# Aplicar la función para categorizar las horas en 'Inicio_Faena' y 'Inicio_Venta'
-df['Hora_Faena'] = df['Inicio_Faena'].dt.hour.apply(categorize_hour)
-
-# Extraer el mes de las columnas 'Inicio_Faena' y 'Inicio_Venta'
-df['Mes_Faena'] = df['Inicio_Faena'].dt.month
-
-# Crear un diccionario para mapear los números de los meses a nombres abreviados
-meses = {
-    1: 'ENE', 2: 'FEB', 3: 'MAR', 4: 'ABR', 5: 'MAY', 6: 'JUN',
-    7: 'JUL', 8: 'AGO', 9: 'SEP', 10: 'OCT', 11: 'NOV', 12: 'DIC'
-}
-
-# Crear una nueva columna 'Mes_Faena' basada en el mes de 'Inicio_Faena' y usar el diccionario de mapeo
-df['Mes_Float'] = df['Inicio_Faena'].dt.month.map(meses)
-
-# Definir los límites de los rangos
-bins_precio = [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55]
-# Definir las etiquetas correspondientes para cada rango
-labels_precio = ["S/ (0 - 5)", "S/ (5 - 10)", "S/ (10 - 15)", "S/ (15 - 20)", "S/ (20 - 25)",
-          "S/ (25 - 30)", "S/ (30 - 35)", "S/ (35 - 40)", "S/ (40 - 45)", "S/ (45 - 50)", "S/ (50 - 55)"]
-
-# Crear la nueva columna 'Precio_Float'
-df['Precio_Float'] = pd.cut(df['Precio_Kg'], bins=bins_precio, labels=labels_precio, right=False)
-
-# Definir los límites de los rangos
-bins_talla = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, 120, 130, 140, 150]
-# Definir las etiquetas correspondientes para cada rango
-labels_talla = ["(10 - 20) cm", "(20 - 30) cm", "(30 - 40) cm", "(40 - 50) cm",
-                "(50 - 60) cm", "(60 - 70) cm", "(70 - 80) cm", "(80 - 90) cm", "(90 - 100) cm",
-                "(100 - 110) cm", "(110 - 120) cm", "(120 - 130) cm", "(130 - 140) cm", "(140 - 150) cm"]
-
-# Crear la nueva columna 'Talla_Float'
-df['Talla_Float'] = pd.cut(df['Talla_cm'], bins=bins_talla, labels=labels_talla, right=False)
+perfil.marcar('Distribución por hora del día', filas=len(df_))
 
-# Crear un nuevo DataFrame eliminando las columnas datatime
-df_ = df.drop(columns=['Inicio_Faena', 'Inicio_Venta'])
+# Histograma ponderado y KDE sobre conteos agrupados (en caché por versión de los datos)
+@st.cache_data
+def obtener_distribucion(columna, pesos, version):
+    return distribuciones.histograma_kde(df_[columna], df_[pesos], bins=24)
 
-# Crear una tabla de frecuencias ponderada
-hist_data = df_.groupby('HFloat_Faena').apply(lambda x: (x['Volumen_Kg'] * len(x)).sum())
-hist_data = hist_data.reset_index(name='Volumen_Total')
+def grafico_distribucion(distribucion, titulo, eje_y):
+    fig = go.Figure()
+    if distribucion is not None:
+        fig.add_trace(go.Bar(x=distribucion['centros'], y=distribucion['alturas'], width=distribucion['ancho'], name='Histograma', opacity=0.75))
+        fig.add_trace(go.Scatter(x=distribucion['x'], y=distribucion['kde'], mode='lines', name='KDE'))
+    fig.update_layout(xaxis_title='Hora del Día', yaxis_title=eje_y, title=titulo, bargap=0)
+    return fig
 
 # Graficar la distribución de las faenas por hora del día
 st.subheader('Distribución de las faenas por Hora del Día')
-fig, ax = plt.subplots(figsize=(10, 6))
-sns.histplot(df_, x='HFloat_Faena', weights='Volumen_Kg', bins=24, kde=True)
-ax.set_xlabel('Hora del Día')
-ax.set_ylabel('Distribución de las faenas')
-ax.set_title('Distribución de las faenas por Hora del Día')
-st.pyplot(fig)
+distribucion = obtener_distribucion('HFloat_Faena', 'Volumen_Kg', datos.version_datos())
+st.plotly_chart(grafico_distribucion(distribucion, 'Distribución de las faenas por Hora del Día', 'Distribución de las faenas'))
 
 # Graficar la distribución de las ventas por hora del día
 st.subheader('Distribución de las Ventas por Hora del Día')
-fig, ax = plt.subplots(figsize=(10, 6))
-sns.histplot(df_, x='HFloat_Venta', weights='Venta', bins=24, kde=True)
-ax.set_xlabel('Hora del Día')
-ax.set_ylabel('Distribución de las Ventas')
-ax.set_title('Distribución de las Ventas por Hora del Día')
-st.pyplot(fig)
-
-# Seleccionamos las columnas numéricas
-numeric_columns = df_.select_dtypes(include=['int64', 'float64', 'int32']).columns
+distribucion = obtener_distribucion('HFloat_Venta', 'Venta', datos.version_datos())
+st.plotly_chart(grafico_distribucion(distribucion, 'Distribución de las Ventas por Hora del Día', 'Distribución de las Ventas'))
 
-# Crear el escalador
-scaler = MinMaxScaler()
+perfil.marcar('Normalización', filas=len(df_))
 
 # Aplicar la normalización
-df_normalized = df_.copy()
-df_normalized[numeric_columns] = scaler.fit_transform(df_[numeric_columns])
+df_normalized = preprocesamiento.normalizar(df_)
 
 st.write("### Datos normalizados")
 st.write(df_normalized.head())
 
+perfil.marcar('Matriz de correlación', filas=len(df_))
+
 # Calcular y graficar la matriz de correlación
 st.subheader('Matriz de Correlación')
 
-# Seleccionar las columnas para la matriz de correlación
-selected_columns = ['Caballos_Motor', 'Millas_Recorridas', 'Volumen_Kg', 'Precio_Kg', 
-                    'Talla_cm', 'Venta', 'Costo_Combustible', 'Ganancia', 
-                    'HFloat_Faena', 'HFloat_Venta', 'Origen_Latitud', 'Origen_Longuitud', 'Mes_Faena']
-
-# Calcular la matriz de correlación
-correlation_matrix = df_normalized[selected_columns].corr()
-
-# Crear el gráfico interactivo con Plotly
-fig = px.imshow(correlation_matrix,
-                labels={'x': 'Variables', 'y': 'Variables', 'color': 'Correlación'},
-                x=correlation_matrix.columns,
-                y=correlation_matrix.columns,
-                color_continuous_scale='Magma',
-                aspect='auto')
-
-# Personalizar el diseño del gráfico
-fig.update_layout(
-    title='Matriz de Correlación entre Variables',
-    coloraxis_showscale=True,
-    xaxis={'side': 'bottom'},
-    yaxis={'side': 'left'}
-)
+# Sumas, sumas de cuadrados y productos cruzados del total y de cada especie y embarcación,
+# guardadas con los agregados del tablero (las faenas nuevas se suman); la correlación no
+# necesita la normalización MinMax
+estadisticas_correlacion = agregados_tablero['correlacion']
+
+# Filtro, gráfico y descarga de la matriz de correlación (fragmento)
+@st.fragment
+def seccion_correlacion():
+    # Filtrar opcionalmente por especie o embarcación
+    filtro = st.radio('Filtrar la matriz de correlación por:', list(estadisticas_correlacion), key='filtro_correlacion', horizontal=True)
+    if filtro == 'Todos':
+        estadisticas_filtro = estadisticas_correlacion['Todos']
+    else:
+        valor_filtro = st.selectbox(f'Selecciona la {filtro.lower()}', sorted(estadisticas_correlacion[filtro]), key='valor_correlacion')
+        estadisticas_filtro = estadisticas_correlacion[filtro][valor_filtro]
+
+    # Calcular la matriz de correlación (solo depende del número de columnas, no de las filas)
+    correlation_matrix = correlacion.matriz(estadisticas_filtro)
+
+    # Crear el gráfico interactivo con Plotly
+    fig = px.imshow(correlation_matrix,
+                    labels={'x': 'Variables', 'y': 'Variables', 'color': 'Correlación'},
+                    x=correlation_matrix.columns,
+                    y=correlation_matrix.columns,
+                    color_continuous_scale='Magma',
+                    aspect='auto')
+
+    # Personalizar el diseño del gráfico
+    fig.update_layout(
+        title='Matriz de Correlación entre Variables',
+        coloraxis_showscale=True,
+        xaxis={'side': 'bottom'},
+        yaxis={'side': 'left'}
+    )
+
+    # Mostrar el gráfico en Streamlit
+    st.plotly_chart(fig)
+
+    # Descargar la matriz de correlación
+    st.subheader('Descargar Matriz de Correlación')
+    csv = correlation_matrix.to_csv(index=True)
+    st.download_button(label="Descargar Matriz de Correlación como CSV",
+                       data=csv,
+                       file_name='matriz_correlacion.csv',
+                       mime='text/csv')
+
+seccion_correlacion()
+
+perfil.marcar('Modelo', filas=len(df_normalized))
+
+# Mejor configuración de hiperparámetros de cada selección
+@st.cache_data(max_entries=64)
+def obtener_ajuste(enfoque, seleccion, version):
+    return ajuste.obtener_ajuste(df_normalized, df_, enfoque, seleccion, version, pipeline=pipeline_modelo, indice=indice_particiones)
+
+# Coordinador de entrenamientos compartido por todas las sesiones del servidor
+@st.cache_resource
+def obtener_coordinador():
+    return coordinador.Coordinador()
+
+# Procesar los datos y entrenar el modelo (o recuperarlo del registro si ya existe para estos datos).
+# Si otra sesión ya está entrenando el mismo modelo se espera a ese entrenamiento en lugar de
+# repetirlo, y mientras tanto se muestra su estado
+def obtener_modelo(enfoque, seleccion, version, parametros=None, motor=modelo.MOTOR_POR_DEFECTO):
+    entrenamientos = obtener_coordinador()
+    clave = registro.clave_modelo(enfoque, seleccion, version, parametros, motor)
+    futuro = entrenamientos.enviar(clave, registro.obtener_modelo, df_normalized, df_, enfoque, seleccion, version,
+                                   parametros=parametros, indice=indice_particiones, n_jobs=entrenamientos.n_jobs(),
+                                   pipeline=pipeline_modelo, motor=motor)
+    if not futuro.done():
+        with st.status(f'Preparando el modelo de {seleccion}...') as estado_modelo:
+            while not futuro.done():
+                estado, segundos, pendientes = entrenamientos.estado(clave)
+                estado_modelo.update(label=f'Modelo de {seleccion}: {estado} ({segundos:.0f} s, {pendientes} entrenamientos pendientes en el servidor)')
+                wait([futuro], timeout=0.5)
+            estado_modelo.update(label=f'Modelo de {seleccion} listo', state='complete')
+    return futuro.result()
+
+# Selección, entrenamiento y gráficos del modelo (fragmento)
+@st.fragment
+def seccion_modelo():
+    # Seleccionar la opción (especie o embarcación)
+    opcion = st.selectbox("Seleccionar el enfoque", ["Embarcación", "Especie"], key="enfoque_selectbox")
+
+    # Clave única para cada selección
+    if opcion == "Embarcación":
+        seleccion = st.selectbox("Seleccionar la embarcación", particiones.valores(indice_particiones, 'Embarcacion'), key="embarcacion_selectbox")
+    else:
+        seleccion = st.selectbox("Seleccionar la especie", particiones.valores(indice_particiones, 'Especie'), key="especie_selectbox")
 
-# Mostrar el gráfico en Streamlit
-st.plotly_chart(fig)
+    # Mostrar la imagen si la opción es "Especie"
+    if opcion == "Especie":
+        especie_seleccionada = seleccion
+        ruta_imagen = f"resources/{especie_seleccionada}.png"
 
-# Descargar la matriz de correlación
-st.subheader('Descargar Matriz de Correlación')
-csv = correlation_matrix.to_csv(index=True)
-st.download_button(label="Descargar Matriz de Correlación como CSV",
-                   data=csv,
-                   file_name='matriz_correlacion.csv',
-                   mime='text/csv')
-
-# Seleccionar la opción (especie o embarcación)
-opcion = st.selectbox("Seleccionar el enfoque", ["Embarcación", "Especie"], key="enfoque_selectbox")
-
-# Clave única para cada selección
-if opcion == "Embarcación":
-    seleccion = st.selectbox("Seleccionar la embarcación", df_normalized['Embarcacion'].unique(), key="embarcacion_selectbox")
-else:
-    seleccion = st.selectbox("Seleccionar la especie", df_normalized['Especie'].unique(), key="especie_selectbox")
-
-# Mostrar la imagen si la opción es "Especie"
-if opcion == "Especie":
-    especie_seleccionada = seleccion
-    ruta_imagen = f"resources/{especie_seleccionada}.png"
-    
-    try:
-        st.image(ruta_imagen, caption=f"Especie: {especie_seleccionada}", use_column_width=True)
-    except FileNotFoundError:
-        st.error(f"No se encontró la imagen para la especie: {especie_seleccionada}")
+        try:
+            st.image(ruta_imagen, caption=f"Especie: {especie_seleccionada}", use_column_width=True)
+        except FileNotFoundError:
+            st.error(f"No se encontró la imagen para la especie: {especie_seleccionada}")
 
-def procesar_datos(df, seleccion, es_embarcacion=True):
-    if es_embarcacion:
-        df_seleccion = df[df['Embarcacion'] == seleccion]
-    else:
-        df_seleccion = df[df['Especie'] == seleccion]
-    
-    if df_seleccion.empty:
-        st.error(f"No se encontraron datos para la {'embarcación' if es_embarcacion else 'especie'}: {seleccion}")
-        return None, None
-    
-    df_seleccion = pd.get_dummies(df_seleccion, columns=['Modelo_Motor', 'Origen', 'Aparejo', 'Hora_Faena', 'Precio_Float', 'Talla_Float', 'Mes_Float'], drop_first=True)
-    X = df_seleccion.drop(columns=['Embarcacion', 'Especie', 'Volumen_Kg', 'Talla_cm', 'Precio_Kg', 'Venta', 'Ganancia', 'Origen_Latitud', 'Origen_Longuitud', 'HFloat_Venta', 'HFloat_Faena', 'Mes_Faena', 'Marca_Motor'])
-    y = df_seleccion['Volumen_Kg'].fillna(0)
-    
-    return X.apply(pd.to_numeric, errors='coerce').fillna(0), y
-
-def entrenar_modelo_con_curvas(X_train, y_train, X_val, y_val, n_estimators=100):
-    train_errors = []
-    val_errors = []
-    modelo = RandomForestRegressor(warm_start=True, random_state=42)
-    
-    for i in range(1, n_estimators + 1):
-        modelo.set_params(n_estimators=i)
-        modelo.fit(X_train, y_train)
-        
-        train_errors.append(mean_squared_error(y_train, modelo.predict(X_train)))
-        val_errors.append(mean_squared_error(y_val, modelo.predict(X_val)))
-    
-    return modelo, train_errors, val_errors
-
-# Procesar los datos
-X, y = procesar_datos(df_normalized, seleccion, es_embarcacion=(opcion == "Embarcación"))
-
-if X is not None and y is not None:
-    if len(X) > 1:
-        X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
-        modelo_rf, train_errors, val_errors = entrenar_modelo_con_curvas(X_train, y_train, X_val, y_val)
+    # Motor del modelo: el gradient boosting usa las categorías sin dummies y entrena y predice más rápido
+    motor = st.radio('Motor del modelo', list(modelo.MOTORES), format_func=modelo.MOTORES.get, key='motor_radio', horizontal=True)
+
+    # Búsqueda opcional de hiperparámetros del bosque (puntuación OOB; la mejor configuración queda guardada)
+    usar_ajuste = motor == 'bosque' and st.checkbox('Ajustar hiperparámetros del bosque (búsqueda con puntuación OOB)', key='ajuste_checkbox')
+
+    try:
+        version_modelo = versiones_modelo[(opcion, seleccion)]
+        parametros = None
+        if usar_ajuste:
+            with st.spinner('Buscando los mejores hiperparámetros...'):
+                mejor = obtener_ajuste(opcion, seleccion, version_modelo)
+            parametros = mejor['parametros']
+            if parametros is None:
+                st.info('Hay muy pocos datos para ajustar los hiperparámetros; se usan los valores por defecto.')
+            else:
+                st.write(f"Mejor configuración (R2 fuera de bolsa: {mejor['oob_r2']:.4f}):", parametros)
+        resultado = obtener_modelo(opcion, seleccion, version_modelo, parametros, motor)
+    except ValueError as error:
+        resultado = None
+        st.error(str(error))
+
+    if resultado is not None:
+        train_errors, val_errors = resultado['train_errors'], resultado['val_errors']
+        y_val, y_val_pred = resultado['y_val'], resultado['y_val_pred']
 
         # Curvas de entrenamiento y validación
         st.subheader(f'Curvas de Entrenamiento y Validación - {seleccion} ({opcion})')
@@ -498,20 +585,7 @@ if X is not None and y is not None:
         Estas curvas muestran cómo de bien nuestro modelo está aprendiendo a predecir el volumen de captura. Si el error de validación es cercano al error de entrenamiento, significa que el modelo es bastante preciso y no se está sobreajustando a los datos de entrenamiento.
         """)
 
-        fig = go.Figure()
-
-        # Añadir líneas para los errores de entrenamiento y validación
-        fig.add_trace(go.Scatter(x=list(range(1, len(train_errors) + 1)), y=train_errors, mode='lines', name='Error de Entrenamiento'))
-        fig.add_trace(go.Scatter(x=list(range(1, len(val_errors) + 1)), y=val_errors, mode='lines', name='Error de Validación'))
-
-        fig.update_layout(
-            xaxis_title='Número de Árboles',
-            yaxis_title='Error Cuadrático Medio',
-            title='Curvas de Entrenamiento y Validación',
-            template='plotly_dark'
-        )
-
-        st.plotly_chart(fig)
+        st.plotly_chart(graficos.figura_curvas(train_errors, val_errors))
 
         # Importancia de características
         st.subheader(f'Importancia de Características - {seleccion} ({opcion})')
@@ -519,30 +593,15 @@ if X is not None and y is not None:
         La importancia de características nos ayuda a entender cuáles variables son más influyentes en la predicción del volumen de captura. Estas son como los ingredientes principales de una receta, donde algunos tienen un mayor impacto en el resultado final.
         """)
 
-        importances = modelo_rf.feature_importances_
-        indices = X_train.columns
-        feature_importances = pd.Series(importances, index=indices).sort_values(ascending=False)
-        
+        feature_importances = graficos.importancias(resultado)
+        if motor == 'boosting':
+            st.caption('Con gradient boosting la importancia se mide por permutación: cuánto empeora el error de validación al desordenar cada variable.')
+
         # Mostrar la característica más influyente
         caracteristica_principal = feature_importances.idxmax()
         st.markdown(f"**La característica más influyente es:** `{caracteristica_principal}`, lo que indica que esta variable tiene el mayor impacto en la predicción del volumen de captura.")
 
-        if 'Hora_Venta' in feature_importances.index:
-            feature_importances = feature_importances.drop('Hora_Venta')
-
-        fig = go.Figure()
-
-        # Añadir las barras de importancia
-        fig.add_trace(go.Bar(x=feature_importances.index, y=feature_importances.values, marker_color='magenta'))
-
-        fig.update_layout(
-            xaxis_title='Características',
-            yaxis_title='Importancia',
-            title=f'Importancia de Características - {seleccion} ({opcion})',
-            template='plotly_dark'
-        )
-
-        st.plotly_chart(fig)
+        st.plotly_chart(graficos.figura_importancias(feature_importances, f'Importancia de Características - {seleccion} ({opcion})'))
 
         # Valores reales vs predichos
         st.subheader(f'Valores Reales vs Predichos - {seleccion} ({opcion})')
@@ -550,24 +609,7 @@ if X is not None and y is not None:
         Este gráfico compara nuestras predicciones con los valores reales observados. Si los puntos se alinean bien con la línea diagonal, significa que nuestro modelo está haciendo un buen trabajo prediciendo el volumen de captura.
         """)
 
-        y_val_pred = modelo_rf.predict(X_val)
-
-        fig = go.Figure()
-
-        # Añadir puntos para valores reales vs predichos
-        fig.add_trace(go.Scatter(x=y_val, y=y_val_pred, mode='markers', name='Valores Reales vs Predichos', marker=dict(color='cyan', opacity=0.5)))
-
-        # Añadir línea de referencia
-        fig.add_trace(go.Scatter(x=[y_val.min(), y_val.max()], y=[y_val.min(), y_val.max()], mode='lines', name='Línea de Referencia', line=dict(color='red', dash='dash')))
-
-        fig.update_layout(
-            xaxis_title='Valores Reales',
-            yaxis_title='Valores Predichos',
-            title=f'Valores Reales vs Predichos - {seleccion} ({opcion})',
-            template='plotly_dark'
-        )
-
-        st.plotly_chart(fig)
+        st.plotly_chart(graficos.figura_real_vs_predicho(y_val, y_val_pred, f'Valores Reales vs Predichos - {seleccion} ({opcion})'))
 
         # Mostrar métricas del modelo
         st.subheader('Métricas del Modelo')
@@ -578,13 +620,20 @@ if X is not None and y is not None:
         - **R2 (Coeficiente de Determinación):** Nos dice qué tan bien las variables explican la variabilidad del resultado.
         """)
 
-        mse = mean_squared_error(y_val, y_val_pred)
-        mae = mean_absolute_error(y_val, y_val_pred)
-        r2 = r2_score(y_val, y_val_pred)
+        mse = resultado['metricas']['mse']
+        mae = resultado['metricas']['mae']
+        r2 = resultado['metricas']['r2']
 
         st.write(f"MSE (Error Cuadrático Medio): {mse:.4f}")
         st.write(f"MAE (Error Absoluto Medio): {mae:.4f}")
         st.write(f"R2 (Coeficiente de Determinación): {r2:.4f}")
-        
-    else:
-        st.error("No hay suficientes datos para dividir en conjuntos de entrenamiento y validación.")
\ No newline at end of file
+
+seccion_modelo()
+
+# Panel de mediciones en la barra lateral (solo si la medición está activada); las
+# reejecuciones de un fragmento no pasan por aquí y no se miden
+mediciones = perfil.finalizar()
+if not mediciones.empty:
+    st.sidebar.subheader('Tiempos por sección')
+    st.sidebar.dataframe(mediciones)
+    st.sidebar.write(f"Total: {mediciones['segundos'].sum():.3f} s")
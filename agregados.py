@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from series import agrupar_por_dia
+
+# Dimensiones y medidas de los gráficos agregados del tablero
+DIMENSIONES = ['Especie', 'Aparejo', 'Marca_Motor', 'Caballos_Motor', 'Embarcacion']
+MEDIDAS = ['Volumen_Kg', 'Ganancia', 'Millas_Recorridas', 'Costo_Combustible']
+
+# Medidas de las series por fecha de faena (sumadas por día)
+MEDIDAS_TIEMPO = ['Ganancia', 'Costo_Combustible']
+
+
+def _sumar(tabla, claves, medidas):
+    # Las medidas se guardan en float32; se suman en float64 para que los totales no pierdan los céntimos
+    return (tabla[claves + medidas].astype(dict.fromkeys(medidas, np.float64))
+            .groupby(claves, dropna=False, observed=True)[medidas].sum().reset_index())
+
+
+def construir_cubo(df):
+    # Suma de las medidas en una sola pasada sobre los datos; todas las vistas del tablero
+    # se obtienen después reagrupando este cubo, que es mucho más pequeño que los datos
+    return {
+        'dimensiones': _sumar(df, DIMENSIONES, MEDIDAS),
+        'tiempo': agrupar_por_dia(df, MEDIDAS_TIEMPO),
+    }
+
+
+def combinar_cubos(cubo, otro):
+    # Las sumas son acumulables: combinar dos cubos equivale a construir uno con todas las filas
+    return {
+        'dimensiones': _sumar(pd.concat([cubo['dimensiones'], otro['dimensiones']], ignore_index=True), DIMENSIONES, MEDIDAS),
+        'tiempo': _sumar(pd.concat([cubo['tiempo'], otro['tiempo']], ignore_index=True), ['Inicio_Faena'], MEDIDAS_TIEMPO),
+    }
+
+
+def actualizar_cubo(cubo, df_nuevo):
+    # Añade al cubo las filas nuevas (viajes agregados al final del registro) sin recalcular el resto
+    return combinar_cubos(cubo, construir_cubo(df_nuevo))
+
+
+def vistas(cubo):
+    # Tablas listas para graficar, calculadas a partir del cubo
+    dimensiones = cubo['dimensiones']
+    tiempo = cubo['tiempo']
+
+    # Agrupar por especie y aparejo, ordenando por la suma total de kilos (de menor a mayor)
+    kilos_especie = dimensiones.groupby(['Especie', 'Aparejo'], observed=True)['Volumen_Kg'].sum().unstack()
+    kilos_especie = kilos_especie.loc[kilos_especie.sum(axis=1).sort_values().index]
+
+    # Ganancias por especie
+    ventas_por_especie = dimensiones.groupby('Especie', observed=True)['Ganancia'].sum().sort_values()
+    df_ventas = ventas_por_especie.reset_index()
+    df_ventas.columns = ['Especie', 'Ganancia']
+
+    # Kilos por marca de motor y caballos de fuerza, en formato largo para Plotly
+    motor = dimensiones.groupby(['Marca_Motor', 'Caballos_Motor'], observed=True)['Volumen_Kg'].sum().unstack()
+    motor_long = motor.reset_index().melt(id_vars='Marca_Motor', var_name='Caballos_Motor', value_name='Volumen_Kg')
+
+    # Ganancia, millas y volumen por embarcación
+    por_embarcacion = dimensiones.groupby('Embarcacion', observed=True)[['Ganancia', 'Millas_Recorridas', 'Volumen_Kg']].sum()
+    datos_combinados = por_embarcacion.rename(columns={'Millas_Recorridas': 'Millas Recorridas', 'Volumen_Kg': 'Volumen de Capturas'})
+    datos_combinados_long = datos_combinados.reset_index().melt(id_vars='Embarcacion', var_name='Métrica', value_name='Valor')
+
+    return {
+        'kilos_especie': kilos_especie,
+        'ventas_especie': df_ventas,
+        'motor_long': motor_long,
+        'ganancia_embarcacion': por_embarcacion['Ganancia'],
+        'millas_embarcacion': por_embarcacion['Millas_Recorridas'],
+        'volumen_embarcacion': por_embarcacion['Volumen_Kg'],
+        'embarcacion_long': datos_combinados_long,
+        'ganancia_fecha': tiempo[['Inicio_Faena', 'Ganancia']],
+        'combustible_fecha': tiempo[['Inicio_Faena', 'Costo_Combustible']],
+    }
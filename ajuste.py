@@ -0,0 +1,153 @@
+import argparse
+import itertools
+import json
+import os
+import time
+import warnings
+
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+
+import caracteristicas
+import datos
+import particiones
+import preprocesamiento
+import registro
+from entrenar_todo import selecciones
+from modelo import dividir_seleccion
+
+# Carpeta donde se guarda la mejor configuración de cada embarcación o especie
+DIRECTORIO_AJUSTES = os.path.join(datos.DIRECTORIO_CACHE, 'ajustes')
+
+# Espacio de búsqueda del bosque
+ESPACIO = {
+    'max_depth': [None, 16, 8],
+    'max_features': [1.0, 0.5, 'sqrt'],
+    'min_samples_leaf': [1, 3, 10],
+}
+
+# Número de árboles que se prueban para cada combinación (se añaden con warm_start)
+ARBOLES = [25, 50, 100, 200, 300]
+
+# Mejora mínima de la puntuación OOB para seguir añadiendo árboles
+TOLERANCIA = 1e-3
+
+# Con menos filas la puntuación OOB no es fiable y se usan los valores por defecto
+MIN_FILAS = 10
+
+
+def combinaciones(espacio=ESPACIO):
+    nombres = list(espacio)
+    return [dict(zip(nombres, valores)) for valores in itertools.product(*espacio.values())]
+
+
+def evaluar(X, y, parametros, arboles=ARBOLES, tolerancia=TOLERANCIA):
+    # Puntuación OOB (R2 sobre las filas que no entraron en el bootstrap de cada árbol) a medida
+    # que crece el bosque; se deja de añadir árboles cuando la puntuación deja de mejorar
+    modelo = RandomForestRegressor(oob_score=True, warm_start=True, random_state=42, n_jobs=1, **parametros)
+    historial = []
+    for n in arboles:
+        modelo.set_params(n_estimators=n)
+        with warnings.catch_warnings():
+            # Con pocos árboles algunas filas aún no tienen predicción OOB
+            warnings.simplefilter('ignore', UserWarning)
+            modelo.fit(X, y)
+        historial.append((n, modelo.oob_score_))
+        if len(historial) > 1 and historial[-1][1] - historial[-2][1] < tolerancia:
+            break
+
+    n_estimators, puntuacion = max(historial, key=lambda h: h[1])
+    return {'parametros': dict(parametros, n_estimators=n_estimators), 'oob_r2': float(puntuacion), 'arboles_probados': len(historial)}
+
+
+def buscar(df, seleccion, es_embarcacion=True, pipeline=None, espacio=ESPACIO, n_jobs=-1, indice=None):
+    # Evalúa todas las combinaciones en paralelo (un bosque de un solo hilo por proceso) sobre
+    # el conjunto de entrenamiento; la validación queda reservada para las métricas finales
+    X_train, _, y_train, _ = dividir_seleccion(df, seleccion, es_embarcacion, pipeline, indice)
+    if len(X_train) < MIN_FILAS:
+        return None
+
+    inicio = time.perf_counter()
+    evaluaciones = Parallel(n_jobs=n_jobs)(delayed(evaluar)(X_train, y_train, p) for p in combinaciones(espacio))
+    evaluaciones.sort(key=lambda e: e['oob_r2'], reverse=True)
+    return {
+        'parametros': evaluaciones[0]['parametros'],
+        'oob_r2': evaluaciones[0]['oob_r2'],
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'evaluaciones': evaluaciones,
+    }
+
+
+def ruta_ajuste(enfoque, seleccion, version, directorio=DIRECTORIO_AJUSTES):
+    return os.path.join(directorio, f'{registro.clave_modelo(enfoque, seleccion, version)}.json')
+
+
+def cargar_ajuste(enfoque, seleccion, version, directorio=DIRECTORIO_AJUSTES):
+    try:
+        with open(ruta_ajuste(enfoque, seleccion, version, directorio), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def guardar_ajuste(enfoque, seleccion, version, ajuste, directorio=DIRECTORIO_AJUSTES):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = ruta_ajuste(enfoque, seleccion, version, directorio)
+    tmp = f'{ruta}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(ajuste, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
+
+    # La configuración de otras versiones de los datos de esta selección ya no se usa
+    registro.invalidar(registro.clave_modelo(enfoque, seleccion, version), directorio, extension='.json')
+
+
+def obtener_ajuste(df, df_, enfoque, seleccion, version=None, pipeline=None, directorio=DIRECTORIO_AJUSTES, n_jobs=-1, indice=None):
+    # Mejor configuración de la selección, buscándola solo si no existe para esta versión de sus
+    # datos (version_seleccion, sobre df_ sin normalizar); si hay muy pocas filas los parámetros
+    # quedan en None (valores por defecto)
+    if pipeline is None:
+        pipeline = caracteristicas.obtener_pipeline(df, registro.huella_datos(df))
+    if indice is None:
+        indice = particiones.construir_indice(df)
+    version = version or registro.version_seleccion(df_, enfoque, seleccion, indice, registro.huella_esquema(pipeline))
+    ajuste = cargar_ajuste(enfoque, seleccion, version, directorio)
+    if ajuste is None:
+        ajuste = buscar(df, seleccion, es_embarcacion=(enfoque == "Embarcación"), pipeline=pipeline, n_jobs=n_jobs, indice=indice)
+        ajuste = ajuste or {'parametros': None, 'oob_r2': None}
+        guardar_ajuste(enfoque, seleccion, version, ajuste, directorio)
+    return ajuste
+
+
+def ajustar_todo(ruta=None, directorio=DIRECTORIO_AJUSTES, n_jobs=-1):
+    df_ = preprocesamiento.preparar_caracteristicas(datos.cargar_datos(ruta))
+    df_normalized = preprocesamiento.normalizar(df_)
+    version = registro.huella_datos(df_normalized)
+    pipeline = caracteristicas.obtener_pipeline(df_normalized, version)
+    indice = particiones.construir_indice(df_normalized)
+    versiones = registro.versiones_particiones(df_, indice, registro.huella_esquema(pipeline))
+    trabajos = selecciones(indice)
+
+    inicio = time.perf_counter()
+    for i, (enfoque, seleccion) in enumerate(trabajos, start=1):
+        try:
+            ajuste = obtener_ajuste(df_normalized, df_, enfoque, seleccion, versiones[(enfoque, seleccion)], pipeline,
+                                    directorio, n_jobs, indice)
+        except ValueError as error:
+            print(f"[{i}/{len(trabajos)}] {enfoque} {seleccion}: {error}")
+            continue
+        if ajuste['parametros'] is None:
+            print(f"[{i}/{len(trabajos)}] {enfoque} {seleccion}: muy pocas filas, se usan los valores por defecto")
+        else:
+            print(f"[{i}/{len(trabajos)}] {enfoque} {seleccion}: OOB R2 = {ajuste['oob_r2']:.4f} {ajuste['parametros']}")
+    print(f"{len(trabajos)} selecciones en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Busca los mejores hiperparámetros del bosque para cada embarcación y especie.')
+    parser.add_argument('--datos', default=None, help='Archivo de datos (data.xlsx o data.csv)')
+    parser.add_argument('--directorio', default=DIRECTORIO_AJUSTES, help='Carpeta de las configuraciones')
+    parser.add_argument('--procesos', type=int, default=-1, help='Número de procesos (por defecto, todos los núcleos)')
+    args = parser.parse_args()
+
+    ajustar_todo(args.datos, args.directorio, args.procesos)
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+import agregados
+import caracteristicas
+import correlacion
+import datos
+import mapa
+import particiones
+import preprocesamiento
+from entrenar_todo import selecciones
+from modelo import MOTORES, crear_modelo, dividir_seleccion, entrenar_modelo_con_curvas, procesar_datos
+
+# Escalas por defecto respecto al tamaño de los datos originales
+ESCALAS = [1, 10, 100]
+
+# Columnas de la comparación de motores (una fila por selección y motor)
+COLUMNAS_MOTORES = ['enfoque', 'seleccion', 'filas', 'motor', 'ajuste_s', 'prediccion_fila_ms', 'prediccion_lote_ms', 'mse', 'mae', 'r2']
+
+# Selecciones con menos filas no se comparan: sus métricas de validación no dicen nada
+MIN_FILAS_MOTORES = 10
+
+
+def generar_datos(df, escala, semilla=42):
+    # Datos sintéticos con el mismo esquema que data.csv: se remuestrean filas reales y cada
+    # réplica se desplaza en el tiempo para que el historial crezca como en la realidad
+    rng = np.random.default_rng(semilla)
+    n = len(df) * escala
+    sintetico = df.iloc[rng.integers(0, len(df), size=n)].reset_index(drop=True)
+    duracion = df['Inicio_Faena'].max() - df['Inicio_Faena'].min() + pd.Timedelta(days=1)
+    desplazamiento = pd.to_timedelta(np.repeat(np.arange(escala), len(df)), unit='D') * duracion.days
+    sintetico['Inicio_Faena'] = sintetico['Inicio_Faena'] + desplazamiento
+    sintetico['Inicio_Venta'] = sintetico['Inicio_Venta'] + desplazamiento
+    return sintetico
+
+
+def escribir_csv(df, ruta):
+    # Mismo formato que data.csv: separado por ';', con BOM y fechas dd mm YYYY HH:MM
+    salida = df[list(datos.TIPOS_CSV)].copy()
+    salida['Inicio_Faena'] = salida['Inicio_Faena'].dt.strftime(datos.FORMATO_FECHA)
+    salida['Inicio_Venta'] = salida['Inicio_Venta'].dt.strftime(datos.FORMATO_FECHA)
+    salida.to_csv(ruta, sep=';', index=False, encoding='utf-8-sig')
+
+
+def medir(funcion, *args, memoria=True):
+    # Tiempo de pared y de CPU de la etapa; el pico de memoria asignada por Python/NumPy se mide
+    # en una segunda ejecución, porque tracemalloc ralentiza bastante el código que observa
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
+    resultado = funcion(*args)
+    metricas = {'segundos': round(time.perf_counter() - inicio, 4),
+                'segundos_cpu': round(time.process_time() - inicio_cpu, 4)}
+
+    if memoria:
+        tracemalloc.start()
+        funcion(*args)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metricas['memoria_pico_mb'] = round(pico / 2**20, 2)
+
+    return resultado, metricas
+
+
+def _correlacion(df_):
+    df_normalized = preprocesamiento.normalizar(df_)
+    return df_normalized, correlacion.matriz(correlacion.estadisticas(df_))
+
+
+def _entrenamiento(df_normalized, pipeline, n_estimators):
+    # Se entrena la embarcación con más registros, que es el peor caso del tablero
+    seleccion = df_normalized['Embarcacion'].value_counts().idxmax()
+    X, y = procesar_datos(df_normalized, seleccion, True, pipeline)
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+    return entrenar_modelo_con_curvas(X_train, y_train, X_val, y_val, n_estimators=n_estimators)
+
+
+def medir_escala(df_base, escala, directorio, n_estimators=100, memoria=True):
+    ruta = os.path.join(directorio, f'data_x{escala}.csv')
+    escribir_csv(generar_datos(df_base, escala), ruta)
+
+    etapas = {}
+    df, etapas['carga'] = medir(datos.leer_csv, ruta, memoria=memoria)
+    _, etapas['agregados'] = medir(lambda d: agregados.vistas(agregados.construir_cubo(d)), df, memoria=memoria)
+    especie = df['Especie'].value_counts().idxmax()
+    _, etapas['mapa'] = medir(lambda d: mapa.html_mapa(d[d['Especie'] == especie]), df, memoria=memoria)
+    df_, etapas['caracteristicas'] = medir(
+        lambda d: preprocesamiento.eliminar_fechas(preprocesamiento.agregar_caracteristicas(d.copy())), df, memoria=memoria)
+    (df_normalized, _), etapas['normalizacion_correlacion'] = medir(_correlacion, df_, memoria=memoria)
+    pipeline, etapas['pipeline'] = medir(caracteristicas.crear_pipeline, df_normalized, memoria=memoria)
+    _, etapas['entrenamiento'] = medir(_entrenamiento, df_normalized, pipeline, n_estimators, memoria=memoria)
+
+    return {'escala': escala, 'filas': len(df), 'bytes_csv': os.path.getsize(ruta), 'etapas': etapas}
+
+
+def ejecutar(escalas=ESCALAS, ruta_salida='benchmark.json', n_estimators=100, memoria=True):
+    df_base = datos.leer_csv('data.csv')
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for escala in escalas:
+            resultado = medir_escala(df_base, escala, directorio, n_estimators, memoria)
+            resultados.append(resultado)
+            print(f"x{escala} ({resultado['filas']} filas): " +
+                  ', '.join(f"{etapa} {m['segundos']:.3f} s" for etapa, m in resultado['etapas'].items()))
+
+    informe = {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'entorno': {'python': platform.python_version(), 'pandas': pd.__version__,
+                    'numpy': np.__version__, 'sklearn': sklearn.__version__,
+                    'cpus': os.cpu_count(), 'plataforma': platform.platform()},
+        'n_estimators': n_estimators,
+        'resultados': resultados,
+    }
+    with open(ruta_salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    return informe
+
+
+def latencia_ms(modelo, X, repeticiones=20):
+    # Mediana del tiempo de predicción, en milisegundos
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        modelo.predict(X)
+        tiempos.append(time.perf_counter() - inicio)
+    return round(float(np.median(tiempos)) * 1000, 4)
+
+
+def comparar_motores(ruta=None, ruta_salida='motores.csv', n_estimators=100, min_filas=MIN_FILAS_MOTORES):
+    # Tiempo de ajuste (sin las curvas), latencia de predicción de una fila y del conjunto de
+    # validación, y métricas de validación de cada motor en cada selección, con la misma partición
+    df_normalized = preprocesamiento.preparar_datos(datos.cargar_datos(ruta))
+    pipeline = caracteristicas.crear_pipeline(df_normalized)
+    indice = particiones.construir_indice(df_normalized)
+
+    filas = []
+    for enfoque, seleccion in selecciones(indice):
+        columna = particiones.COLUMNA_ENFOQUE[enfoque]
+        if len(particiones.posiciones(indice, columna, seleccion)) < min_filas:
+            continue
+        for motor in MOTORES:
+            X_train, X_val, y_train, y_val = dividir_seleccion(df_normalized, seleccion, enfoque == "Embarcación", pipeline, indice, motor)
+            modelo = crear_modelo(motor, n_estimators)
+            inicio = time.perf_counter()
+            modelo.fit(X_train, y_train)
+            ajuste = time.perf_counter() - inicio
+            y_val_pred = modelo.predict(X_val)
+            filas.append({
+                'enfoque': enfoque, 'seleccion': seleccion, 'filas': len(X_train) + len(X_val), 'motor': motor,
+                'ajuste_s': round(ajuste, 4),
+                'prediccion_fila_ms': latencia_ms(modelo, X_val.iloc[:1]),
+                'prediccion_lote_ms': latencia_ms(modelo, X_val),
+                'mse': mean_squared_error(y_val, y_val_pred),
+                'mae': mean_absolute_error(y_val, y_val_pred),
+                'r2': r2_score(y_val, y_val_pred),
+            })
+
+    comparacion = pd.DataFrame(filas, columns=COLUMNAS_MOTORES)
+    comparacion.to_csv(ruta_salida, index=False)
+
+    # Resumen por motor y, para cada selección, el motor más barato de ajustar entre los que
+    # quedan a menos de un 5 % del menor error de validación
+    print(comparacion.groupby('motor')[['ajuste_s', 'prediccion_fila_ms', 'prediccion_lote_ms', 'mse', 'r2']].median()
+          .rename(columns=lambda c: f'{c} (mediana)').to_string())
+    mejor_mse = comparacion.groupby(['enfoque', 'seleccion'])['mse'].transform('min')
+    candidatos = comparacion[comparacion['mse'] <= mejor_mse * 1.05]
+    recomendados = candidatos.loc[candidatos.groupby(['enfoque', 'seleccion'])['ajuste_s'].idxmin(), 'motor']
+    print('Motor recomendado: ' + ', '.join(f'{MOTORES[m]} en {n} selecciones' for m, n in recomendados.value_counts().items()))
+    return comparacion
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide el tiempo y la memoria de cada etapa de PP.py con datos sintéticos.')
+    parser.add_argument('--escalas', default=','.join(map(str, ESCALAS)), help='Factores de escala separados por comas')
+    parser.add_argument('--salida', default='benchmark.json', help='Archivo JSON de resultados')
+    parser.add_argument('--arboles', type=int, default=100, help='Número de árboles del Random Forest')
+    parser.add_argument('--sin-memoria', action='store_true', help='No medir el pico de memoria (evita repetir cada etapa)')
+    parser.add_argument('--motores', action='store_true',
+                        help='Comparar los motores del modelo en cada selección con los datos reales, en lugar de medir las etapas')
+    parser.add_argument('--salida-motores', default='motores.csv', help='Archivo CSV de la comparación de motores')
+    args = parser.parse_args()
+
+    if args.motores:
+        comparar_motores(ruta_salida=args.salida_motores, n_estimators=args.arboles)
+    else:
+        ejecutar([int(e) for e in args.escalas.split(',')], args.salida, args.arboles, memoria=not args.sin_memoria)
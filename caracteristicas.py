@@ -0,0 +1,91 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import OneHotEncoder
+
+import datos
+
+# Columnas categóricas que se convierten en variables dummy
+COLUMNAS_DUMMIES = ['Modelo_Motor', 'Origen', 'Aparejo', 'Hora_Faena', 'Precio_Float', 'Talla_Float', 'Mes_Float']
+
+# Columnas que no se usan como características del modelo
+COLUMNAS_EXCLUIDAS = ['Embarcacion', 'Especie', 'Volumen_Kg', 'Talla_cm', 'Precio_Kg', 'Venta', 'Ganancia', 'Origen_Latitud', 'Origen_Longuitud', 'HFloat_Venta', 'HFloat_Faena', 'Mes_Faena', 'Marca_Motor']
+
+
+def columnas_numericas(df):
+    return [c for c in df.columns if c not in COLUMNAS_DUMMIES + COLUMNAS_EXCLUIDAS]
+
+
+def crear_pipeline(df):
+    # Se ajusta una sola vez sobre todos los datos, de modo que todas las embarcaciones y
+    # especies comparten el mismo esquema de columnas
+    pipeline = ColumnTransformer(
+        [('categoricas', OneHotEncoder(drop='first', handle_unknown='ignore', dtype=np.float32), COLUMNAS_DUMMIES),
+         ('numericas', SimpleImputer(strategy='constant', fill_value=0), columnas_numericas(df))],
+        sparse_threshold=1.0,
+        verbose_feature_names_out=False
+    )
+    return pipeline.fit(df)
+
+
+def nombres_columnas(pipeline):
+    return list(pipeline.get_feature_names_out())
+
+
+def transformar(pipeline, df):
+    # Matriz dispersa (CSR) con las dummies y las columnas numéricas
+    return pipeline.transform(df).tocsr()
+
+
+def transformar_denso(pipeline, df):
+    # Los árboles se entrenan bastante más rápido con matrices densas; las filas de una
+    # selección son pocas, así que se densifica solo ese subconjunto
+    return pd.DataFrame(transformar(pipeline, df).toarray().astype(np.float32),
+                        columns=nombres_columnas(pipeline), index=df.index)
+
+
+def transformar_categorico(pipeline, df):
+    # Para los modelos con categorías nativas (gradient boosting): una columna por variable
+    # categórica con el código de su categoría (el orden de las categorías del pipeline, NaN si es
+    # desconocida) en lugar de sus dummies, y las columnas numéricas igual que en transformar
+    codificador = pipeline.named_transformers_['categoricas']
+    columnas = {}
+    for columna, categorias in zip(COLUMNAS_DUMMIES, codificador.categories_):
+        codigos = pd.Index(categorias).get_indexer(df[columna].astype(object))
+        columnas[columna] = np.where(codigos >= 0, codigos, np.nan).astype(np.float32)
+    numericas = pipeline.named_transformers_['numericas']
+    valores = numericas.transform(df[list(numericas.feature_names_in_)]).astype(np.float32)
+    columnas.update(zip(numericas.feature_names_in_, valores.T))
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def ruta_pipeline(version):
+    return os.path.join(datos.DIRECTORIO_CACHE, f'pipeline_{version[:16]}.joblib')
+
+
+def obtener_pipeline(df, version):
+    # Pipeline ajustado para esta versión de los datos, guardado en disco para reutilizarlo
+    # en el entrenamiento por lotes, la predicción y las siguientes sesiones
+    ruta = ruta_pipeline(version)
+    pipeline = datos.cargar_joblib(ruta)
+    if pipeline is not None:
+        return pipeline
+    pipeline = crear_pipeline(df)
+    os.makedirs(datos.DIRECTORIO_CACHE, exist_ok=True)
+    tmp = f'{ruta}.{os.getpid()}.tmp'
+    joblib.dump(pipeline, tmp)
+    os.replace(tmp, ruta)
+
+    # Los pipelines de versiones anteriores de los datos ya no se usan
+    for nombre in os.listdir(datos.DIRECTORIO_CACHE):
+        if nombre.startswith('pipeline_') and nombre.endswith('.joblib') and nombre != os.path.basename(ruta):
+            try:
+                os.remove(os.path.join(datos.DIRECTORIO_CACHE, nombre))
+            except OSError:
+                pass
+    return pipeline
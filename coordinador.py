@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Coordinador:
+    # Entrenamientos compartidos por todas las sesiones del proceso: cada clave se entrena una sola
+    # vez aunque la pidan varias sesiones a la vez (todas esperan el mismo Future), los trabajos
+    # distintos se reparten en un pool acotado y los últimos resultados se guardan en memoria (LRU)
+
+    def __init__(self, max_trabajos=2, max_resultados=32):
+        self.max_trabajos = max_trabajos
+        self.max_resultados = max_resultados
+        self.pool = ThreadPoolExecutor(max_workers=max_trabajos, thread_name_prefix='entrenamiento')
+        self._en_curso = {}
+        self._resultados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def n_jobs(self):
+        # Núcleos para cada trabajo, para que los trabajos simultáneos no se los disputen
+        return max(1, (os.cpu_count() or 1) // self.max_trabajos)
+
+    def enviar(self, clave, funcion, *args, **kwargs):
+        with self._lock:
+            if clave in self._resultados:
+                self._resultados.move_to_end(clave)
+                futuro = Future()
+                futuro.set_result(self._resultados[clave])
+                return futuro
+            if clave in self._en_curso:
+                return self._en_curso[clave][0]
+            futuro = self.pool.submit(funcion, *args, **kwargs)
+            self._en_curso[clave] = (futuro, time.perf_counter())
+        futuro.add_done_callback(lambda f: self._terminar(clave, f))
+        return futuro
+
+    def _terminar(self, clave, futuro):
+        with self._lock:
+            self._en_curso.pop(clave, None)
+            # Los errores no se guardan: la siguiente petición vuelve a intentarlo
+            if futuro.exception() is None:
+                self._resultados[clave] = futuro.result()
+                if len(self._resultados) > self.max_resultados:
+                    self._resultados.popitem(last=False)
+
+    def estado(self, clave):
+        # ('listo' | 'entrenando' | 'en cola', segundos desde que se pidió, trabajos pendientes)
+        with self._lock:
+            pendientes = len(self._en_curso)
+            if clave not in self._en_curso:
+                return 'listo', 0.0, pendientes
+            futuro, inicio = self._en_curso[clave]
+        return ('entrenando' if futuro.running() else 'en cola'), time.perf_counter() - inicio, pendientes
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from preprocesamiento import columnas_correlacion
+
+
+def estadisticas(df, columnas=columnas_correlacion):
+    # Estadísticos suficientes de la correlación de Pearson por pares de filas completas (igual
+    # que DataFrame.corr): para cada par (i, j), sobre las filas en que ambas tienen valor,
+    # el número de filas, la suma de i, la suma de i² y la suma de i·j. Son sumas, así que se
+    # pueden acumular por bloques o combinar entre particiones
+    valores = df[columnas].to_numpy(dtype=np.float64, na_value=np.nan)
+    presentes = np.isfinite(valores).astype(np.float64)
+    valores = np.where(presentes > 0, valores, 0.0)
+    return {
+        'columnas': list(columnas),
+        'n': presentes.T @ presentes,
+        'suma': valores.T @ presentes,
+        'suma_cuadrados': (valores ** 2).T @ presentes,
+        'productos': valores.T @ valores,
+    }
+
+
+def combinar(est, otras):
+    if est is None:
+        return otras
+    return {
+        'columnas': est['columnas'],
+        'n': est['n'] + otras['n'],
+        'suma': est['suma'] + otras['suma'],
+        'suma_cuadrados': est['suma_cuadrados'] + otras['suma_cuadrados'],
+        'productos': est['productos'] + otras['productos'],
+    }
+
+
+def estadisticas_por_grupo(df, grupo, columnas=columnas_correlacion):
+    # Estadísticos de cada especie o embarcación; la suma de todos equivale a los del total
+    return {valor: estadisticas(df_grupo, columnas)
+            for valor, df_grupo in df.groupby(grupo, observed=True, sort=False)}
+
+
+def combinar_por_grupo(est, otras):
+    # Combina los estadísticos de cada especie o embarcación (los grupos nuevos se añaden)
+    if est is None:
+        return otras
+    return {**est, **{valor: combinar(est.get(valor), e) for valor, e in otras.items()}}
+
+
+def matriz(est):
+    # Matriz de correlación a partir de los estadísticos: O(columnas²), sin recorrer las filas.
+    # La correlación no cambia al normalizar con MinMax, así que no hace falta normalizar antes
+    n, suma, suma_cuadrados = est['n'], est['suma'], est['suma_cuadrados']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covarianza = n * est['productos'] - suma * suma.T
+        varianza = n * suma_cuadrados - suma ** 2
+        correlacion = covarianza / np.sqrt(varianza * varianza.T)
+    correlacion = np.clip(correlacion, -1, 1)
+    correlacion[n < 2] = np.nan
+    return pd.DataFrame(correlacion, index=est['columnas'], columns=est['columnas'])
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Archivos de origen soportados (el primero que exista se usa por defecto)
+FUENTES = ['data.xlsx', 'data.csv']
+
+# Carpeta donde se guarda la copia columnar de los datos
+DIRECTORIO_CACHE = '.cache'
+
+# Formato de las fechas en el archivo CSV (dd mm YYYY HH:MM)
+FORMATO_FECHA = '%d %m %Y %H:%M'
+
+# Se incrementa cuando cambia el contenido de la copia columnar, para regenerarla
+VERSION_CACHE = 2
+
+# Columnas de dimensión (texto muy repetido) que se guardan como categorías
+COLUMNAS_CATEGORICAS = ['Embarcacion', 'Marca_Motor', 'Modelo_Motor', 'Origen', 'Especie', 'Aparejo']
+
+# Tipos compactos de las medidas
+TIPOS_COMPACTOS = {
+    'Caballos_Motor': 'int16', 'Tiempo_Faena': 'int16', 'Origen_Latitud': 'float32',
+    'Origen_Longuitud': 'float32', 'Millas_Recorridas': 'float32', 'Volumen_Kg': 'float32',
+    'Talla_cm': 'float32', 'Precio_Kg': 'float32', 'Venta': 'float32', 'Precio_Galon': 'float32',
+    'Costo_Combustible': 'float32', 'Ganancia': 'float32',
+}
+
+
+def ruta_por_defecto():
+    for ruta in FUENTES:
+        if os.path.exists(ruta):
+            return ruta
+    raise FileNotFoundError(f"No se encontró ninguno de los archivos de datos: {', '.join(FUENTES)}")
+
+
+def hash_archivo(ruta, tam_bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+# Tipos de las columnas del CSV; Precio_Kg se lee como texto porque algunas filas traen 'S/3.00'
+TIPOS_CSV = {
+    'Inicio_Faena': str, 'Inicio_Venta': str, 'Embarcacion': str, 'Marca_Motor': str,
+    'Modelo_Motor': str, 'Caballos_Motor': 'int64', 'Origen': str, 'Origen_Latitud': 'float64',
+    'Origen_Longuitud': 'float64', 'Millas_Recorridas': 'float64', 'Especie': str, 'Aparejo': str,
+    'Volumen_Kg': 'float64', 'Talla_cm': 'float64', 'Precio_Kg': str, 'Venta': 'float64',
+    'Precio_Galon': 'float64', 'Costo_Combustible': 'float64', 'Ganancia': 'float64',
+}
+
+
+def limpiar_csv(df):
+    # El CSV viene con las fechas como texto (dd mm YYYY HH:MM) y precios como 'S/3.00' en algunas filas.
+    # También sirve para registros sueltos con el mismo formato (p. ej. los del servicio de predicción),
+    # donde el precio puede llegar como número
+    df['Inicio_Faena'] = pd.to_datetime(df['Inicio_Faena'], format=FORMATO_FECHA)
+    df['Inicio_Venta'] = pd.to_datetime(df['Inicio_Venta'], format=FORMATO_FECHA)
+    df['Precio_Kg'] = pd.to_numeric(df['Precio_Kg'].replace(r'^S/', '', regex=True))
+    return df
+
+
+def leer_csv(ruta):
+    # El CSV viene separado por ';' y con BOM
+    return limpiar_csv(pd.read_csv(ruta, sep=';', encoding='utf-8-sig', dtype=TIPOS_CSV))
+
+
+def leer_csv_por_bloques(ruta, tam_bloque=100_000):
+    # Lee el CSV por partes de tam_bloque filas, para procesar historiales que no caben en memoria
+    with pd.read_csv(ruta, sep=';', encoding='utf-8-sig', dtype=TIPOS_CSV, chunksize=tam_bloque) as lector:
+        for bloque in lector:
+            yield compactar(limpiar_csv(bloque))
+
+
+def compactar(df):
+    # Categorías para las dimensiones y float32 / enteros pequeños para las medidas. Los enteros
+    # fuera del rango de su tipo se rechazan (astype los desbordaría sin avisar)
+    tipos = {c: 'category' for c in COLUMNAS_CATEGORICAS if c in df.columns}
+    tipos.update({c: t for c, t in TIPOS_COMPACTOS.items() if c in df.columns})
+    for columna, tipo in tipos.items():
+        if tipo.startswith('int'):
+            rango = np.iinfo(tipo)
+            valores = pd.to_numeric(df[columna])
+            if ((valores < rango.min) | (valores > rango.max)).any():
+                raise ValueError(f"{columna} fuera del rango admitido ({rango.min} a {rango.max})")
+    return df.astype(tipos)
+
+
+def leer_fuente(ruta):
+    if ruta.endswith('.csv'):
+        return compactar(leer_csv(ruta))
+    return compactar(pd.read_excel(ruta))
+
+
+def _rutas_cache(ruta):
+    nombre = os.path.basename(ruta)
+    return (os.path.join(DIRECTORIO_CACHE, f'{nombre}.parquet'),
+            os.path.join(DIRECTORIO_CACHE, f'{nombre}.json'))
+
+
+def _leer_meta(ruta_meta):
+    try:
+        with open(ruta_meta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_meta(ruta_meta, meta):
+    tmp = f'{ruta_meta}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, ruta_meta)
+
+
+def actualizar_cache(ruta=None):
+    # Devuelve la ruta del Parquet y la versión (hash del contenido) de los datos,
+    # regenerando la copia columnar solo si el archivo de origen cambió
+    ruta = ruta or ruta_por_defecto()
+    ruta_parquet, ruta_meta = _rutas_cache(ruta)
+    estado = os.stat(ruta)
+    meta = _leer_meta(ruta_meta)
+
+    if meta is not None and meta.get('formato') == VERSION_CACHE and os.path.exists(ruta_parquet):
+        # Si la fecha de modificación y el tamaño coinciden no hace falta leer el archivo
+        if meta['mtime_ns'] == estado.st_mtime_ns and meta['tamano'] == estado.st_size:
+            return ruta_parquet, meta['version']
+        # Si solo cambió la fecha (p. ej. una copia) pero el contenido es el mismo, se reutiliza
+        version = hash_archivo(ruta)
+        if meta['version'] == version:
+            meta.update(mtime_ns=estado.st_mtime_ns, tamano=estado.st_size)
+            _escribir_meta(ruta_meta, meta)
+            return ruta_parquet, version
+    else:
+        version = hash_archivo(ruta)
+
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    df = leer_fuente(ruta)
+    tmp = f'{ruta_parquet}.tmp'
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, ruta_parquet)
+    _escribir_meta(ruta_meta, {'mtime_ns': estado.st_mtime_ns, 'tamano': estado.st_size, 'version': version,
+                               'formato': VERSION_CACHE})
+    return ruta_parquet, version
+
+
+def cargar_joblib(ruta):
+    # Lee un archivo de la caché (modelo o pipeline); si falta devuelve None y si está truncado o
+    # no se puede leer (joblib lanza errores de varios tipos, p. ej. ValueError) se elimina, para
+    # que se vuelva a generar en lugar de fallar en cada lectura
+    try:
+        return joblib.load(ruta)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+        return None
+
+
+def version_datos(ruta=None):
+    return actualizar_cache(ruta)[1]
+
+
+def cargar_datos(ruta=None):
+    ruta_parquet, _ = actualizar_cache(ruta)
+    # Lectura con memory map: los buffers de Arrow no se copian al leer
+    tabla = pq.read_table(ruta_parquet, memory_map=True)
+    return tabla.to_pandas()
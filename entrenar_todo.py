@@ -0,0 +1,167 @@
+import argparse
+import csv
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import caracteristicas
+import datos
+import ingesta
+import modelo
+import particiones
+import preprocesamiento
+import registro
+
+# Columnas de la tabla consolidada de métricas
+COLUMNAS_METRICAS = ['enfoque', 'seleccion', 'version', 'filas', 'mse', 'mae', 'r2', 'segundos', 'error']
+
+# Datos sin normalizar y normalizados, pipeline e índice de particiones de cada proceso del pool
+# (se cargan una sola vez por proceso)
+_df_ = None
+_df_normalized = None
+_pipeline = None
+_indice = None
+
+
+def _iniciar_proceso(ruta, version):
+    global _df_, _df_normalized, _pipeline, _indice
+    _df_ = preprocesamiento.preparar_caracteristicas(datos.cargar_datos(ruta))
+    _df_normalized = preprocesamiento.normalizar(_df_)
+    _pipeline = caracteristicas.obtener_pipeline(_df_normalized, version)
+    _indice = particiones.construir_indice(_df_normalized)
+
+
+def _entrenar(enfoque, seleccion, version, directorio, umbral, motor):
+    # version: la de los datos de la selección; si solo recibió unas pocas filas nuevas (por debajo
+    # del umbral) el registro reutiliza su modelo anterior en lugar de reentrenarlo
+    inicio = time.perf_counter()
+    fila = {'enfoque': enfoque, 'seleccion': seleccion, 'version': version}
+    reutilizado = False
+    try:
+        # n_jobs=1: el paralelismo lo pone el pool de procesos
+        resultado = registro.obtener_modelo(_df_normalized, _df_, enfoque, seleccion, version, directorio, indice=_indice,
+                                            n_jobs=1, pipeline=_pipeline, umbral=umbral, motor=motor)
+    except ValueError as error:
+        fila['error'] = str(error)
+    else:
+        fila.update(resultado['metricas'], filas=resultado['filas'])
+        reutilizado = resultado['version'] != version
+    fila['segundos'] = round(time.perf_counter() - inicio, 3)
+    return fila, reutilizado
+
+
+def selecciones(indice):
+    # Todas las combinaciones de enfoque y selección que ofrece la interfaz
+    trabajos = [("Embarcación", s) for s in particiones.valores(indice, 'Embarcacion')]
+    trabajos += [("Especie", s) for s in particiones.valores(indice, 'Especie')]
+    return trabajos
+
+
+def _leer_metricas(ruta_metricas):
+    # Filas de la tabla de métricas por (enfoque, selección)
+    if not os.path.exists(ruta_metricas):
+        return {}
+    with open(ruta_metricas, newline='', encoding='utf-8') as f:
+        return {(fila['enfoque'], fila['seleccion']): fila for fila in csv.DictReader(f)}
+
+
+def _escribir_metricas(ruta_metricas, filas, orden):
+    # Una fila por selección, en el orden de la interfaz; se reescribe en un archivo temporal y se
+    # reemplaza, de modo que una interrupción no deja la tabla a medias
+    tmp = f'{ruta_metricas}.{os.getpid()}.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUMNAS_METRICAS, extrasaction='ignore')
+        escritor.writeheader()
+        escritor.writerows(filas[t] for t in orden if t in filas)
+    os.replace(tmp, ruta_metricas)
+
+
+def _leer_completados(filas, versiones, directorio, motor):
+    # Filas de las selecciones cuyos datos no cambiaron desde que se entrenó su modelo (sigue en
+    # disco con la versión actual; sus métricas se guardan con él) o que ya fallaron con estos
+    # mismos datos. Las filas de versiones anteriores se descartan
+    completados = {}
+    for t, version in versiones.items():
+        fila = filas.get(t)
+        actual = fila is not None and fila['version'] == version
+        if actual and fila['error']:
+            completados[t] = fila
+            continue
+        # Se lee el modelo (no basta con que exista el archivo): si está dañado, cargar_modelo lo
+        # elimina y la selección se vuelve a entrenar
+        resultado = registro.cargar_modelo(registro.clave_modelo(*t, version, motor=motor), directorio)
+        if resultado is not None:
+            completados[t] = fila if actual else {'enfoque': t[0], 'seleccion': t[1], 'version': version,
+                                                  'filas': resultado['filas'], **resultado['metricas']}
+    return completados
+
+
+def entrenar_todo(ruta=None, ruta_metricas='metricas.csv', directorio=registro.DIRECTORIO_MODELOS, procesos=None, reanudar=True,
+                  umbral=registro.UMBRAL_REENTRENAMIENTO, motor=modelo.MOTOR_POR_DEFECTO):
+    # Con reanudar solo se entrenan las selecciones cuyos datos cambiaron (p. ej. con filas nuevas
+    # en el registro de faenas) o que quedaron pendientes; las demás conservan su modelo
+    df = datos.cargar_datos(ruta)
+    # Los agregados del tablero se ponen al día en la misma ingesta (solo se suman las filas nuevas)
+    print(f"Agregados del tablero al día ({ingesta.actualizar_agregados(df, ruta)['filas']} filas)")
+    df_ = preprocesamiento.preparar_caracteristicas(df)
+    df_normalized = preprocesamiento.normalizar(df_)
+    version = registro.huella_datos(df_normalized)
+    indice = particiones.construir_indice(df_normalized)
+    trabajos = selecciones(indice)
+
+    # El pipeline de características se ajusta aquí una vez y los procesos lo leen de disco
+    pipeline = caracteristicas.obtener_pipeline(df_normalized, version)
+    versiones = registro.versiones_particiones(df_, indice, registro.huella_esquema(pipeline))
+
+    if reanudar:
+        filas = _leer_completados(_leer_metricas(ruta_metricas), versiones, directorio, motor)
+        print(f"{len(filas)} selecciones sin cambios, {len(trabajos) - len(filas)} con datos nuevos o pendientes")
+    else:
+        filas = {}
+        # Se entrena todo otra vez, sin reutilizar modelos anteriores
+        for enfoque, seleccion in trabajos:
+            clave = registro.clave_modelo(enfoque, seleccion, versiones[(enfoque, seleccion)], motor=motor)
+            if os.path.exists(registro.ruta_modelo(clave, directorio)):
+                os.remove(registro.ruta_modelo(clave, directorio))
+        umbral = 0
+    orden = trabajos
+    trabajos = [t for t in trabajos if t not in filas]
+    _escribir_metricas(ruta_metricas, filas, orden)
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), initializer=_iniciar_proceso, initargs=(ruta, version)) as pool:
+        futuros = [pool.submit(_entrenar, enfoque, seleccion, versiones[(enfoque, seleccion)], directorio, umbral, motor)
+                   for enfoque, seleccion in trabajos]
+        for i, futuro in enumerate(as_completed(futuros), start=1):
+            fila, reutilizado = futuro.result()
+            # Se reescribe la tabla al terminar cada selección para poder reanudar tras una interrupción
+            filas[(fila['enfoque'], fila['seleccion'])] = fila
+            _escribir_metricas(ruta_metricas, filas, orden)
+            transcurrido = time.perf_counter() - inicio
+            print(f"[{i}/{len(trabajos)}] {fila['enfoque']} {fila['seleccion']}: "
+                  f"{fila.get('error') or 'R2 = {:.4f}'.format(fila['r2'])}{' (modelo anterior)' if reutilizado else ''} "
+                  f"({i / transcurrido:.2f} modelos/s)")
+
+    transcurrido = time.perf_counter() - inicio
+    if trabajos:
+        print(f"{len(trabajos)} modelos en {transcurrido:.1f} s ({len(trabajos) / transcurrido:.2f} modelos/s)")
+    return ruta_metricas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Entrena los modelos de todas las embarcaciones y especies.')
+    parser.add_argument('--datos', default=None, help='Archivo de datos (data.xlsx o data.csv)')
+    parser.add_argument('--metricas', default=None, help='Tabla consolidada de métricas (CSV; por defecto, una por motor)')
+    parser.add_argument('--directorio', default=registro.DIRECTORIO_MODELOS, help='Carpeta de los modelos')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, todos los núcleos)')
+    parser.add_argument('--desde-cero', action='store_true', help='Ignorar los resultados de una ejecución anterior')
+    parser.add_argument('--umbral', type=float, default=registro.UMBRAL_REENTRENAMIENTO,
+                        help='Fracción de filas nuevas de una selección por debajo de la cual se conserva su modelo')
+    parser.add_argument('--motor', choices=list(modelo.MOTORES), default=modelo.MOTOR_POR_DEFECTO, help='Motor de los modelos')
+    args = parser.parse_args()
+
+    # Cada motor lleva su propia tabla de métricas, para no mezclar sus resultados al reanudar
+    ruta_metricas = args.metricas or ('metricas.csv' if args.motor == modelo.MOTOR_POR_DEFECTO else f'metricas_{args.motor}.csv')
+    entrenar_todo(args.datos, ruta_metricas, args.directorio, args.procesos, reanudar=not args.desde_cero, umbral=args.umbral,
+                  motor=args.motor)
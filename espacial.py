@@ -0,0 +1,109 @@
+import branca.colormap as cm
+import folium
+import numpy as np
+import pandas as pd
+
+# Lado de cada celda de la rejilla, en grados (0.05° ≈ 5.5 km)
+TAMANO_CELDA = 0.05
+
+# Medidas que se acumulan por celda
+MEDIDAS = ['Volumen_Kg', 'Venta', 'Costo_Combustible']
+
+
+def agregar_celdas(df, tam_celda=TAMANO_CELDA):
+    # Suma de las medidas y número de faenas por celda de la rejilla; las sumas se pueden
+    # combinar entre bloques o con las filas nuevas, como el cubo de agregados
+    validos = df['Origen_Latitud'].notna() & df['Origen_Longuitud'].notna()
+    df = df[validos]
+    fila = np.floor(df['Origen_Latitud'].to_numpy(dtype=np.float64) / tam_celda).astype(np.int64)
+    columna = np.floor(df['Origen_Longuitud'].to_numpy(dtype=np.float64) / tam_celda).astype(np.int64)
+    return (df[MEDIDAS].astype(np.float64).assign(fila=fila, columna=columna, Faenas=1)
+            .groupby(['fila', 'columna'])[['Faenas'] + MEDIDAS].sum().reset_index())
+
+
+def indice_desde_celdas(celdas, tam_celda=TAMANO_CELDA):
+    # Rejilla densa con sumas acumuladas en dos dimensiones (tabla de áreas sumadas): el total de
+    # cualquier rectángulo de celdas se obtiene con cuatro lecturas, sin recorrer las faenas
+    celdas = celdas.sort_values(['fila', 'columna']).reset_index(drop=True)
+    if celdas.empty:
+        return {'tam_celda': tam_celda, 'celdas': celdas, 'origen': (0, 0), 'acumulado': {}}
+    origen = (int(celdas['fila'].min()), int(celdas['columna'].min()))
+    forma = (int(celdas['fila'].max()) - origen[0] + 1, int(celdas['columna'].max()) - origen[1] + 1)
+    filas, columnas = celdas['fila'].to_numpy() - origen[0], celdas['columna'].to_numpy() - origen[1]
+
+    acumulado = {}
+    for medida in ['Faenas'] + MEDIDAS:
+        rejilla = np.zeros(forma)
+        rejilla[filas, columnas] = celdas[medida].to_numpy()
+        acumulado[medida] = np.pad(rejilla.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+
+    celdas = celdas.assign(Latitud=(celdas['fila'] + 0.5) * tam_celda, Longitud=(celdas['columna'] + 0.5) * tam_celda)
+    return {'tam_celda': tam_celda, 'celdas': celdas, 'origen': origen, 'acumulado': acumulado}
+
+
+def construir_indice(df, tam_celda=TAMANO_CELDA):
+    return indice_desde_celdas(agregar_celdas(df, tam_celda), tam_celda)
+
+
+def actualizar_indice(indice, df_nuevo):
+    # Añade las faenas nuevas sumando sus celdas a las existentes
+    tam_celda = indice['tam_celda']
+    celdas = pd.concat([indice['celdas'][['fila', 'columna', 'Faenas'] + MEDIDAS], agregar_celdas(df_nuevo, tam_celda)])
+    return indice_desde_celdas(celdas.groupby(['fila', 'columna']).sum().reset_index(), tam_celda)
+
+
+def _rango(indice, lat_min, lat_max, lon_min, lon_max):
+    # Filas y columnas de la rejilla (relativas al origen) que tocan el rectángulo, recortadas
+    tam_celda, (fila0, columna0) = indice['tam_celda'], indice['origen']
+    n_filas, n_columnas = next(iter(indice['acumulado'].values())).shape
+    f0 = max(int(np.floor(lat_min / tam_celda)) - fila0, 0)
+    f1 = min(int(np.floor(lat_max / tam_celda)) - fila0 + 1, n_filas - 1)
+    c0 = max(int(np.floor(lon_min / tam_celda)) - columna0, 0)
+    c1 = min(int(np.floor(lon_max / tam_celda)) - columna0 + 1, n_columnas - 1)
+    return f0, f1, c0, c1
+
+
+def totales(indice, lat_min, lat_max, lon_min, lon_max):
+    # Faenas y sumas de las medidas en las celdas que tocan el rectángulo, en tiempo constante
+    if not indice['acumulado']:
+        return dict.fromkeys(['Faenas'] + MEDIDAS, 0.0)
+    f0, f1, c0, c1 = _rango(indice, lat_min, lat_max, lon_min, lon_max)
+    if f0 >= f1 or c0 >= c1:
+        return dict.fromkeys(indice['acumulado'], 0.0)
+    return {medida: float(a[f1, c1] - a[f0, c1] - a[f1, c0] + a[f0, c0]) for medida, a in indice['acumulado'].items()}
+
+
+def celdas_en(indice, lat_min, lat_max, lon_min, lon_max):
+    # Celdas con faenas que tocan el rectángulo (las filas están ordenadas, se localizan por búsqueda binaria)
+    celdas = indice['celdas']
+    if celdas.empty:
+        return celdas
+    tam_celda = indice['tam_celda']
+    fila = celdas['fila'].to_numpy()
+    inicio = np.searchsorted(fila, np.floor(lat_min / tam_celda), side='left')
+    fin = np.searchsorted(fila, np.floor(lat_max / tam_celda), side='right')
+    tramo = celdas.iloc[inicio:fin]
+    columna = tramo['columna'].to_numpy()
+    return tramo[(columna >= np.floor(lon_min / tam_celda)) & (columna <= np.floor(lon_max / tam_celda))]
+
+
+def crear_mapa_rejilla(celdas, medida='Volumen_Kg', tam_celda=TAMANO_CELDA):
+    # Una celda coloreada por la suma de la medida, en lugar de un punto por faena
+    centro = [np.average(celdas['Latitud'], weights=celdas['Faenas']),
+              np.average(celdas['Longitud'], weights=celdas['Faenas'])]
+    mapa = folium.Map(location=centro, zoom_start=8)
+    minimo, maximo = float(celdas[medida].min()), float(celdas[medida].max())
+    escala = cm.linear.YlOrRd_09.scale(minimo, maximo if maximo > minimo else minimo + 1)
+    escala.caption = medida
+    for lat, lon, faenas, valor in celdas[['Latitud', 'Longitud', 'Faenas', medida]].itertuples(index=False):
+        folium.Rectangle(
+            bounds=[[lat - tam_celda / 2, lon - tam_celda / 2], [lat + tam_celda / 2, lon + tam_celda / 2]],
+            color=None, fill=True, fill_color=escala(valor), fill_opacity=0.7,
+            tooltip=f"Faenas: {faenas:,.0f}<br>{medida}: {valor:,.2f}"
+        ).add_to(mapa)
+    escala.add_to(mapa)
+    return mapa
+
+
+def html_mapa_rejilla(celdas, medida='Volumen_Kg', tam_celda=TAMANO_CELDA):
+    return folium.Figure().add_child(crear_mapa_rejilla(celdas, medida, tam_celda)).render()
@@ -0,0 +1,92 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def figura_captura_especie(df_agrupado_kilos, log_y=False):
+    # Captura por especie y aparejo (barras apiladas)
+    titulo = 'Captura total por especie (Escala Logarítmica)' if log_y else 'Captura total por especie'
+    fig = px.bar(df_agrupado_kilos,
+                 title=titulo,
+                 labels={'value': 'Kilos', 'index': 'Especie'},
+                 log_y=log_y,
+                 text_auto=True)
+    fig.update_layout(yaxis_title='Kilos (Logarítmico)' if log_y else 'Kilos', xaxis_title='Especie', xaxis_tickangle=-45)
+    return fig
+
+
+def figura_ganancia_especie(df_ventas, log_y=False):
+    escala = 'Escala Logarítmica' if log_y else 'Escala Normal'
+    fig = px.bar(df_ventas,
+                 x='Especie',
+                 y='Ganancia',
+                 title=f'Ganancia por Especie ({escala})',
+                 labels={'Ganancia': 'Ganancia (Suma Total)', 'Especie': 'Especie'},
+                 color='Ganancia',
+                 text='Ganancia',
+                 log_y=log_y)
+    fig.update_layout(xaxis_title='Especie', yaxis_title='Ganancia (Suma Total) (Logarítmica)' if log_y else 'Ganancia (Suma Total)',
+                      xaxis_tickangle=-45)
+    return fig
+
+
+def figura_curvas(train_errors, val_errors):
+    fig = go.Figure()
+
+    # Añadir líneas para los errores de entrenamiento y validación
+    fig.add_trace(go.Scatter(x=list(range(1, len(train_errors) + 1)), y=train_errors, mode='lines', name='Error de Entrenamiento'))
+    fig.add_trace(go.Scatter(x=list(range(1, len(val_errors) + 1)), y=val_errors, mode='lines', name='Error de Validación'))
+
+    fig.update_layout(
+        xaxis_title='Número de Árboles',
+        yaxis_title='Error Cuadrático Medio',
+        title='Curvas de Entrenamiento y Validación',
+        template='plotly_dark'
+    )
+    return fig
+
+
+def importancias(resultado):
+    # Importancia de cada columna del modelo, de mayor a menor (la del bosque por impureza; la del
+    # gradient boosting, por permutación, viene calculada con el resultado)
+    importancias = resultado['importancias'] if 'importancias' in resultado else resultado['modelo'].feature_importances_
+    return pd.Series(importancias, index=resultado['columnas']).sort_values(ascending=False)
+
+
+def figura_importancias(feature_importances, titulo):
+    if 'Hora_Venta' in feature_importances.index:
+        feature_importances = feature_importances.drop('Hora_Venta')
+
+    # Las columnas del esquema común que no aparecen en esta selección tienen importancia cero
+    feature_importances = feature_importances[feature_importances > 0]
+
+    fig = go.Figure()
+
+    # Añadir las barras de importancia
+    fig.add_trace(go.Bar(x=feature_importances.index, y=feature_importances.values, marker_color='magenta'))
+
+    fig.update_layout(
+        xaxis_title='Características',
+        yaxis_title='Importancia',
+        title=titulo,
+        template='plotly_dark'
+    )
+    return fig
+
+
+def figura_real_vs_predicho(y_val, y_val_pred, titulo):
+    fig = go.Figure()
+
+    # Añadir puntos para valores reales vs predichos
+    fig.add_trace(go.Scatter(x=y_val, y=y_val_pred, mode='markers', name='Valores Reales vs Predichos', marker=dict(color='cyan', opacity=0.5)))
+
+    # Añadir línea de referencia
+    fig.add_trace(go.Scatter(x=[y_val.min(), y_val.max()], y=[y_val.min(), y_val.max()], mode='lines', name='Línea de Referencia', line=dict(color='red', dash='dash')))
+
+    fig.update_layout(
+        xaxis_title='Valores Reales',
+        yaxis_title='Valores Predichos',
+        title=titulo,
+        template='plotly_dark'
+    )
+    return fig
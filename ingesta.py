@@ -0,0 +1,108 @@
+import argparse
+import hashlib
+import os
+import time
+
+import joblib
+import pandas as pd
+
+import agregados
+import correlacion
+import datos
+import espacial
+import preprocesamiento
+
+# Se incrementa cuando cambia lo que se guarda en los agregados del tablero, para recalcularlos
+VERSION_AGREGADOS = 3
+
+
+def resumir_csv(ruta='data.csv', tam_bloque=100_000):
+    # Recorre el CSV por bloques y acumula el cubo de agregados del tablero y las estadísticas
+    # de normalización y de correlación; la memoria depende del tamaño del bloque, no del historial completo
+    cubo = None
+    estadisticas = None
+    est_correlacion = None
+    filas = 0
+
+    for bloque in datos.leer_csv_por_bloques(ruta, tam_bloque):
+        cubo_bloque = agregados.construir_cubo(bloque)
+        cubo = cubo_bloque if cubo is None else agregados.combinar_cubos(cubo, cubo_bloque)
+
+        bloque_ = preprocesamiento.eliminar_fechas(preprocesamiento.agregar_caracteristicas(bloque))
+        estadisticas = preprocesamiento.combinar_estadisticas(
+            estadisticas, preprocesamiento.estadisticas_normalizacion(bloque_))
+        est_correlacion = correlacion.combinar(est_correlacion, correlacion.estadisticas(bloque_))
+        filas += len(bloque)
+
+    return {'cubo': cubo, 'estadisticas': estadisticas, 'correlacion': est_correlacion, 'filas': filas}
+
+
+def ruta_agregados(ruta=None):
+    # Un archivo por fuente de datos, junto a su copia columnar
+    nombre = os.path.basename(ruta or datos.ruta_por_defecto())
+    return os.path.join(datos.DIRECTORIO_CACHE, f'agregados_{nombre}.joblib')
+
+
+def _huella(hashes):
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+def estadisticas_correlacion(df_):
+    # Estadísticos de la correlación del total y de cada especie y embarcación
+    return {
+        'Todos': correlacion.estadisticas(df_),
+        'Especie': correlacion.estadisticas_por_grupo(df_, 'Especie'),
+        'Embarcación': correlacion.estadisticas_por_grupo(df_, 'Embarcacion'),
+    }
+
+
+def sumar_filas(resumen, df_nuevo):
+    # Suma las filas nuevas a los agregados (o los calcula si aún no hay ninguno)
+    est_nuevas = estadisticas_correlacion(preprocesamiento.preparar_caracteristicas(df_nuevo))
+    if resumen is None:
+        return {'cubo': agregados.construir_cubo(df_nuevo), 'indice': espacial.construir_indice(df_nuevo),
+                'correlacion': est_nuevas}
+    est = resumen['correlacion']
+    return {'cubo': agregados.actualizar_cubo(resumen['cubo'], df_nuevo),
+            'indice': espacial.actualizar_indice(resumen['indice'], df_nuevo),
+            'correlacion': {'Todos': correlacion.combinar(est['Todos'], est_nuevas['Todos']),
+                            'Especie': correlacion.combinar_por_grupo(est['Especie'], est_nuevas['Especie']),
+                            'Embarcación': correlacion.combinar_por_grupo(est['Embarcación'], est_nuevas['Embarcación'])}}
+
+
+def actualizar_agregados(df, ruta=None):
+    # Agregados del tablero guardados en disco con el número de filas y la huella de los datos con
+    # que se calcularon. El registro de faenas solo crece por el final: si los datos actuales
+    # empiezan por esas mismas filas solo se suman las nuevas; si no (filas editadas o borradas),
+    # se recalculan con todos los datos
+    ruta_resumen = ruta_agregados(ruta)
+    resumen = datos.cargar_joblib(ruta_resumen)
+    filas = resumen['filas'] if resumen is not None and resumen.get('formato') == VERSION_AGREGADOS else 0
+    # Un hash por fila: la huella de las primeras filas y la de todas salen de una sola pasada
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    if not 0 < filas <= len(df) or _huella(hashes[:filas]) != resumen['huella']:
+        resumen, filas = None, 0
+    elif filas == len(df):
+        return resumen
+
+    resumen = sumar_filas(resumen, df.iloc[filas:])
+    resumen.update(formato=VERSION_AGREGADOS, filas=len(df), huella=_huella(hashes))
+    os.makedirs(datos.DIRECTORIO_CACHE, exist_ok=True)
+    tmp = f'{ruta_resumen}.{os.getpid()}.tmp'
+    joblib.dump(resumen, tmp)
+    os.replace(tmp, ruta_resumen)
+    return resumen
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resume un CSV de faenas por bloques, sin cargarlo entero en memoria.')
+    parser.add_argument('ruta', nargs='?', default='data.csv', help='Archivo CSV separado por ";"')
+    parser.add_argument('--bloque', type=int, default=100_000, help='Filas por bloque')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumen = resumir_csv(args.ruta, args.bloque)
+    print(f"{resumen['filas']} filas en {time.perf_counter() - inicio:.2f} s")
+    print(f"Cubo: {len(resumen['cubo']['dimensiones'])} celdas, {len(resumen['cubo']['tiempo'])} fechas")
+    print(resumen['estadisticas'].T.to_string())
+    print(correlacion.matriz(resumen['correlacion']).round(3).to_string())
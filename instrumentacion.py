@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+
+import pandas as pd
+
+# Variable de entorno y parámetro de la URL que activan la medición ('1' o 'memoria')
+VARIABLE_ENTORNO = 'PP_PERFIL'
+PARAMETRO_URL = 'perfil'
+
+# Las mediciones se emiten como líneas JSON en este logger
+log = logging.getLogger('pp.perfil')
+if not log.handlers:
+    _manejador = logging.StreamHandler()
+    _manejador.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(_manejador)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+# tracemalloc y su pico son globales del proceso: solo una ejecución a la vez mide memoria
+_medicion_memoria = threading.Lock()
+
+
+def _liberar_memoria(iniciado):
+    # Deja el proceso como estaba: si esta ejecución activó tracemalloc, lo desactiva
+    if iniciado:
+        tracemalloc.stop()
+    _medicion_memoria.release()
+
+
+def modo(parametros=None):
+    # '' (desactivado), '1' (tiempos) o 'memoria' (tiempos y pico de memoria con tracemalloc)
+    valor = (parametros or {}).get(PARAMETRO_URL) or os.environ.get(VARIABLE_ENTORNO, '')
+    return valor if valor in ('1', 'memoria') else ''
+
+
+class Perfil:
+    # Mide cada sección de una ejecución del script: cada llamada a marcar() cierra la sección
+    # anterior y abre la siguiente, así no hace falta reindentar el código que se mide.
+    # El pico de memoria de tracemalloc es de todo el proceso, incluidas otras sesiones; si otra
+    # ejecución ya está midiendo memoria, esta mide solo tiempos para no reiniciarle el pico.
+
+    def __init__(self, modo=''):
+        self.activo = bool(modo)
+        self.memoria = modo == 'memoria' and _medicion_memoria.acquire(blocking=False)
+        self.ejecucion = uuid.uuid4().hex[:12]
+        self.mediciones = []
+        self._actual = None
+        if self.memoria:
+            iniciado = not tracemalloc.is_tracing()
+            if iniciado:
+                tracemalloc.start()
+            # Se libera en finalizar() o, si la ejecución se interrumpe antes (p. ej. una
+            # reejecución de Streamlit), cuando se descarta este objeto
+            self._liberar = weakref.finalize(self, _liberar_memoria, iniciado)
+
+    def marcar(self, seccion, filas=None):
+        if not self.activo:
+            return
+        self._cerrar()
+        memoria_inicial = 0
+        if self.memoria:
+            tracemalloc.reset_peak()
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+        self._actual = (seccion, filas, memoria_inicial, time.perf_counter(), time.process_time())
+
+    def _cerrar(self):
+        if self._actual is None:
+            return
+        seccion, filas, memoria_inicial, inicio, inicio_cpu = self._actual
+        medicion = {
+            'ejecucion': self.ejecucion,
+            'seccion': seccion,
+            'segundos': round(time.perf_counter() - inicio, 4),
+            'segundos_cpu': round(time.process_time() - inicio_cpu, 4),
+            'filas': filas,
+        }
+        if self.memoria:
+            # Memoria máxima asignada durante la sección por encima de la que había al empezar
+            pico = tracemalloc.get_traced_memory()[1] - memoria_inicial
+            medicion['memoria_pico_mb'] = round(pico / 2**20, 2)
+        self.mediciones.append(medicion)
+        log.info(json.dumps(medicion, ensure_ascii=False))
+        self._actual = None
+
+    def finalizar(self):
+        # Cierra la última sección y devuelve la tabla de mediciones (vacía si no está activo)
+        if not self.activo:
+            return pd.DataFrame()
+        self._cerrar()
+        if self.memoria:
+            self._liberar()
+        return pd.DataFrame(self.mediciones).drop(columns='ejecucion').set_index('seccion')
@@ -0,0 +1,44 @@
+import folium
+import numpy as np
+
+from folium.plugins import HeatMap, MarkerCluster
+
+# Columnas que identifican un punto de origen
+COLUMNAS_ORIGEN = ['Origen', 'Origen_Latitud', 'Origen_Longuitud']
+
+
+def agregar_origenes(df_filtrado):
+    # Un registro por punto de origen con el número de faenas, los kilos y la venta total (sumados
+    # en float64, ya que las medidas se guardan en float32)
+    return (df_filtrado.astype({'Volumen_Kg': np.float64, 'Venta': np.float64}).groupby(COLUMNAS_ORIGEN, observed=True)
+            .agg(Faenas=('Volumen_Kg', 'size'), Volumen_Kg=('Volumen_Kg', 'sum'), Venta=('Venta', 'sum'))
+            .reset_index())
+
+
+def crear_mapa(origenes):
+    # El centro es la media de las coordenadas de todas las faenas (ponderada por número de faenas)
+    centro = [np.average(origenes['Origen_Latitud'], weights=origenes['Faenas']),
+              np.average(origenes['Origen_Longuitud'], weights=origenes['Faenas'])]
+    mapa = folium.Map(location=centro, zoom_start=6)
+
+    # Un marcador por origen, agrupados en el navegador cuando se superponen
+    marcadores = MarkerCluster(name='Orígenes').add_to(mapa)
+    for origen, lat, lon, faenas, volumen, venta in origenes[COLUMNAS_ORIGEN + ['Faenas', 'Volumen_Kg', 'Venta']].itertuples(index=False):
+        folium.Marker(
+            location=[lat, lon],
+            popup=folium.Popup(f"<b>{origen}</b><br>Faenas: {faenas}<br>Volumen: {volumen:,.0f} kg<br>Venta: S/ {venta:,.2f}", max_width=250),
+            tooltip=origen
+        ).add_to(marcadores)
+
+    # Capa de calor ponderada por los kilos capturados
+    HeatMap(origenes[['Origen_Latitud', 'Origen_Longuitud', 'Volumen_Kg']].values.tolist(),
+            name='Volumen (calor)', show=False).add_to(mapa)
+    folium.LayerControl().add_to(mapa)
+
+    return mapa
+
+
+def html_mapa(df_filtrado):
+    # HTML completo del mapa, listo para guardarse en caché y mostrarse sin volver a generarlo
+    figura = folium.Figure().add_child(crear_mapa(agregar_origenes(df_filtrado)))
+    return figura.render()
@@ -0,0 +1,138 @@
+import numpy as np
+
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+import caracteristicas
+import particiones
+
+# Motores disponibles para el modelo de cada selección y su nombre en la interfaz
+MOTORES = {'bosque': 'Random Forest', 'boosting': 'Gradient boosting por histogramas'}
+MOTOR_POR_DEFECTO = 'bosque'
+
+
+def procesar_datos(df, seleccion, es_embarcacion=True, pipeline=None, indice=None, motor=MOTOR_POR_DEFECTO):
+    # Con el índice de particiones las filas se toman por posición en lugar de comparar toda la columna
+    columna = 'Embarcacion' if es_embarcacion else 'Especie'
+    if indice is not None:
+        df_seleccion = particiones.seleccionar(df, indice, columna, seleccion)
+    else:
+        df_seleccion = df[df[columna] == seleccion]
+
+    if df_seleccion.empty:
+        return None, None
+
+    # El pipeline se ajusta sobre todos los datos para que el esquema de columnas sea el mismo
+    # en todas las selecciones; lo normal es recibirlo ya ajustado
+    if pipeline is None:
+        pipeline = caracteristicas.crear_pipeline(df)
+
+    # El gradient boosting trata las categorías de forma nativa y no necesita las dummies
+    if motor == 'boosting':
+        X = caracteristicas.transformar_categorico(pipeline, df_seleccion)
+    else:
+        X = caracteristicas.transformar_denso(pipeline, df_seleccion)
+    y = df_seleccion['Volumen_Kg'].fillna(0)
+
+    return X, y
+
+
+def predicciones_por_arbol(modelo, X, n_jobs=None):
+    # Matriz (n_arboles, n_muestras) con la predicción de cada árbol por separado
+    X = np.asarray(X, dtype=np.float32)
+    predicciones = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(arbol.predict)(X, check_input=False) for arbol in modelo.estimators_
+    )
+    return np.vstack(predicciones)
+
+
+def errores_por_prefijo(predicciones, y):
+    # La predicción de un bosque con los primeros k árboles es la media de esos k árboles,
+    # por lo que basta con la suma acumulada de las predicciones individuales
+    y = np.asarray(y)
+    n_arboles = predicciones.shape[0]
+    promedios = np.cumsum(predicciones, axis=0) / np.arange(1, n_arboles + 1)[:, None]
+    return [mean_squared_error(y, promedios[i]) for i in range(n_arboles)]
+
+
+def crear_modelo(motor=MOTOR_POR_DEFECTO, n_estimators=100, n_jobs=-1, parametros=None):
+    # parametros: hiperparámetros del modelo (p. ej. los del bosque elegidos por ajuste.py)
+    if motor not in MOTORES:
+        raise ValueError(f"Motor no válido: {motor}")
+    parametros = dict(parametros or {})
+    n_estimators = parametros.pop('n_estimators', n_estimators)
+    if motor == 'boosting':
+        # Un árbol por iteración; sin parada temprana para que las curvas tengan siempre la misma longitud.
+        # Las hojas de 20 filas por defecto dejan sin divisiones a las selecciones pequeñas
+        parametros.setdefault('min_samples_leaf', 3)
+        return HistGradientBoostingRegressor(max_iter=n_estimators, categorical_features=caracteristicas.COLUMNAS_DUMMIES,
+                                             early_stopping=False, random_state=42, **parametros)
+    return RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs, **parametros)
+
+
+def entrenar_modelo_con_curvas(X_train, y_train, X_val, y_val, n_estimators=100, n_jobs=-1, parametros=None, motor=MOTOR_POR_DEFECTO):
+    # Se entrena el modelo completo una sola vez; en el bosque, con la misma semilla los árboles
+    # son idénticos a los que se obtenían añadiendo un árbol por iteración con warm_start
+    modelo = crear_modelo(motor, n_estimators, n_jobs, parametros)
+    modelo.fit(X_train, y_train)
+
+    if motor == 'boosting':
+        # staged_predict da la predicción tras cada iteración, sin volver a entrenar
+        train_errors = [mean_squared_error(y_train, prediccion) for prediccion in modelo.staged_predict(X_train)]
+        val_errors = [mean_squared_error(y_val, prediccion) for prediccion in modelo.staged_predict(X_val)]
+    else:
+        train_errors = errores_por_prefijo(predicciones_por_arbol(modelo, X_train, n_jobs), y_train)
+        val_errors = errores_por_prefijo(predicciones_por_arbol(modelo, X_val, n_jobs), y_val)
+
+    return modelo, train_errors, val_errors
+
+
+def dividir_seleccion(df, seleccion, es_embarcacion=True, pipeline=None, indice=None, motor=MOTOR_POR_DEFECTO):
+    # Conjuntos de entrenamiento y validación de una embarcación o especie (misma partición
+    # para el entrenamiento y para la búsqueda de hiperparámetros)
+    X, y = procesar_datos(df, seleccion, es_embarcacion, pipeline, indice, motor)
+
+    if X is None:
+        raise ValueError(f"No se encontraron datos para la {'embarcación' if es_embarcacion else 'especie'}: {seleccion}")
+    if len(X) <= 1:
+        raise ValueError("No hay suficientes datos para dividir en conjuntos de entrenamiento y validación.")
+
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def entrenar_seleccion(df, seleccion, es_embarcacion=True, n_jobs=-1, pipeline=None, parametros=None, indice=None,
+                       motor=MOTOR_POR_DEFECTO):
+    # Procesa los datos de una embarcación o especie y entrena su modelo; devuelve todo lo
+    # necesario para dibujar las curvas, importancias y métricas sin volver a entrenar
+    if pipeline is None:
+        pipeline = caracteristicas.crear_pipeline(df)
+    X_train, X_val, y_train, y_val = dividir_seleccion(df, seleccion, es_embarcacion, pipeline, indice, motor)
+    modelo, train_errors, val_errors = entrenar_modelo_con_curvas(X_train, y_train, X_val, y_val, n_jobs=n_jobs, parametros=parametros,
+                                                                  motor=motor)
+    y_val_pred = modelo.predict(X_val)
+
+    resultado = {
+        'modelo': modelo,
+        'motor': motor,
+        'pipeline': pipeline,
+        'columnas': list(X_train.columns),
+        'filas': len(X_train) + len(X_val),
+        'train_errors': train_errors,
+        'val_errors': val_errors,
+        'y_val': y_val,
+        'y_val_pred': y_val_pred,
+        'metricas': {
+            'mse': mean_squared_error(y_val, y_val_pred),
+            'mae': mean_absolute_error(y_val, y_val_pred),
+            'r2': r2_score(y_val, y_val_pred),
+        },
+    }
+    if motor == 'boosting':
+        # El gradient boosting no calcula importancias por impureza; se miden por permutación
+        # sobre el conjunto de validación
+        resultado['importancias'] = permutation_importance(modelo, X_val, y_val, scoring='neg_mean_squared_error', n_repeats=5,
+                                                           random_state=42, n_jobs=n_jobs)['importances_mean']
+    return resultado
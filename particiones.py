@@ -0,0 +1,31 @@
+import numpy as np
+
+# Columnas por las que se filtra el tablero y se entrena un modelo por valor
+COLUMNAS_PARTICION = ['Especie', 'Embarcacion']
+
+# Enfoques del modelo y la columna que identifica cada selección
+COLUMNA_ENFOQUE = {"Embarcación": 'Embarcacion', "Especie": 'Especie'}
+
+
+def construir_indice(df, columnas=COLUMNAS_PARTICION):
+    # Posiciones de las filas de cada especie y embarcación, en una sola pasada por columna.
+    # Los valores quedan en el orden en que aparecen en los datos (el mismo que .unique())
+    indice = {}
+    for columna in columnas:
+        posiciones = df.groupby(columna, observed=True, sort=False).indices
+        indice[columna] = dict(sorted(posiciones.items(), key=lambda item: item[1][0]))
+    return indice
+
+
+def valores(indice, columna):
+    return list(indice[columna])
+
+
+def posiciones(indice, columna, valor):
+    return indice[columna].get(valor, np.empty(0, dtype=np.intp))
+
+
+def seleccionar(df, indice, columna, valor):
+    # Filas de un valor sin recorrer la columna completa; las posiciones sirven para cualquier
+    # DataFrame derivado con las mismas filas en el mismo orden (p. ej. los datos normalizados)
+    return df.iloc[posiciones(indice, columna, valor)]
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from sklearn.preprocessing import MinMaxScaler
+
+# Crear un diccionario para mapear los números de los meses a nombres abreviados
+meses = {
+    1: 'ENE', 2: 'FEB', 3: 'MAR', 4: 'ABR', 5: 'MAY', 6: 'JUN',
+    7: 'JUL', 8: 'AGO', 9: 'SEP', 10: 'OCT', 11: 'NOV', 12: 'DIC'
+}
+
+# Definir los límites de los rangos
+bins_precio = [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55]
+# Definir las etiquetas correspondientes para cada rango
+labels_precio = ["S/ (0 - 5)", "S/ (5 - 10)", "S/ (10 - 15)", "S/ (15 - 20)", "S/ (20 - 25)",
+          "S/ (25 - 30)", "S/ (30 - 35)", "S/ (35 - 40)", "S/ (40 - 45)", "S/ (45 - 50)", "S/ (50 - 55)"]
+
+# Definir los límites de los rangos
+bins_talla = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, 120, 130, 140, 150]
+# Definir las etiquetas correspondientes para cada rango
+labels_talla = ["(10 - 20) cm", "(20 - 30) cm", "(30 - 40) cm", "(40 - 50) cm",
+                "(50 - 60) cm", "(60 - 70) cm", "(70 - 80) cm", "(80 - 90) cm", "(90 - 100) cm",
+                "(100 - 110) cm", "(110 - 120) cm", "(120 - 130) cm", "(130 - 140) cm", "(140 - 150) cm"]
+
+# Columnas para la matriz de correlación
+columnas_correlacion = ['Caballos_Motor', 'Millas_Recorridas', 'Volumen_Kg', 'Precio_Kg',
+                        'Talla_cm', 'Venta', 'Costo_Combustible', 'Ganancia',
+                        'HFloat_Faena', 'HFloat_Venta', 'Origen_Latitud', 'Origen_Longuitud', 'Mes_Faena']
+
+
+# Función para categorizar la hora en intervalos de 2 horas considerando A.M. y P.M.
+def categorize_hour(hour):
+    period = "A.M." if hour < 12 else "P.M."
+    hour_12 = hour % 12
+    hour_12 = 12 if hour_12 == 0 else hour_12
+    start_hour = hour_12
+    end_hour = (hour_12 + 2) % 12
+    end_hour = 12 if end_hour == 0 else end_hour
+    return f"{start_hour:02d} - {end_hour:02d} {period}"
+
+
+# Etiqueta de cada una de las 24 horas, para categorizar sin recorrer fila por fila
+etiquetas_hora = [categorize_hour(h) for h in range(24)]
+
+# Nombre abreviado de cada mes (posición 0 = enero)
+etiquetas_mes = [meses[m] for m in range(1, 13)]
+
+
+def agregar_caracteristicas(df):
+    # Convertir la columna 'Inicio_Faena' y 'Fecha_Venta' a datetime
+    df['Inicio_Faena'] = pd.to_datetime(df['Inicio_Faena'], format='%d %m %Y %H:%M')
+    df['Inicio_Venta'] = pd.to_datetime(df['Inicio_Venta'], format='%d %m %Y %H:%M')
+
+    # Transformar las columnas 'Inicio_Faena' y 'Inicio_Venta' en valores flotantes (hora + minutos/60)
+    df['HFloat_Faena'] = (df['Inicio_Faena'].dt.hour + df['Inicio_Faena'].dt.minute / 60).astype(np.float32)
+    df['HFloat_Venta'] = (df['Inicio_Venta'].dt.hour + df['Inicio_Venta'].dt.minute / 60).astype(np.float32)
+
+    # Categorizar las horas de 'Inicio_Faena' con la tabla de etiquetas (la hora es el código)
+    df['Hora_Faena'] = pd.Categorical.from_codes(df['Inicio_Faena'].dt.hour.to_numpy(), categories=etiquetas_hora)
+
+    # Extraer el mes de las columnas 'Inicio_Faena' y 'Inicio_Venta'
+    df['Mes_Faena'] = df['Inicio_Faena'].dt.month.astype(np.int8)
+
+    # Crear una nueva columna 'Mes_Float' con el nombre abreviado del mes de 'Inicio_Faena'
+    df['Mes_Float'] = pd.Categorical.from_codes(df['Mes_Faena'].to_numpy() - 1, categories=etiquetas_mes)
+
+    # Crear las nuevas columnas 'Precio_Float' y 'Talla_Float'
+    df['Precio_Float'] = pd.cut(df['Precio_Kg'], bins=bins_precio, labels=labels_precio, right=False)
+    df['Talla_Float'] = pd.cut(df['Talla_cm'], bins=bins_talla, labels=labels_talla, right=False)
+
+    return df
+
+
+def eliminar_fechas(df):
+    # Crear un nuevo DataFrame eliminando las columnas datatime
+    return df.drop(columns=['Inicio_Faena', 'Inicio_Venta'])
+
+
+def columnas_a_normalizar(df_):
+    # Seleccionamos las columnas numéricas
+    return df_.select_dtypes(include='number').columns
+
+
+def normalizar(df_):
+    numeric_columns = columnas_a_normalizar(df_)
+
+    # Crear el escalador
+    scaler = MinMaxScaler()
+
+    # Aplicar la normalización; las columnas no numéricas se comparten con df_ en lugar de copiarse
+    valores = scaler.fit_transform(df_[numeric_columns])
+    return _reemplazar_columnas(df_, numeric_columns, valores)
+
+
+def _reemplazar_columnas(df_, columnas, valores):
+    # Copia superficial: solo las columnas reemplazadas ocupan memoria nueva
+    df_normalized = df_.copy(deep=False)
+    for i, columna in enumerate(columnas):
+        df_normalized[columna] = valores[:, i]
+    return df_normalized
+
+
+def estadisticas_normalizacion(df_):
+    # Mínimo y máximo de cada columna numérica; es todo lo que necesita la normalización MinMax
+    numeric_columns = columnas_a_normalizar(df_)
+    return df_[numeric_columns].agg(['min', 'max'])
+
+
+def combinar_estadisticas(estadisticas, otras):
+    # Combina las estadísticas de dos bloques de filas como si se hubieran calculado juntas
+    if estadisticas is None:
+        return otras
+    return pd.DataFrame({'min': estadisticas.loc['min'].combine(otras.loc['min'], min),
+                         'max': estadisticas.loc['max'].combine(otras.loc['max'], max)}).T
+
+
+def normalizar_con_estadisticas(df_, estadisticas):
+    # Igual que normalizar(), pero con mínimos y máximos ya calculados (p. ej. por bloques o
+    # los del entrenamiento); las columnas constantes quedan en 0, como con MinMaxScaler
+    columnas = [c for c in estadisticas.columns if c in df_.columns]
+    minimo = estadisticas.loc['min', columnas]
+    rango = estadisticas.loc['max', columnas] - minimo
+    rango[rango == 0] = 1
+    valores = ((df_[columnas] - minimo) / rango).to_numpy()
+    return _reemplazar_columnas(df_, columnas, valores)
+
+
+def preparar_caracteristicas(df):
+    # Características de PP.py sin normalizar (el df_ del tablero)
+    return eliminar_fechas(agregar_caracteristicas(df.copy(deep=False)))
+
+
+def preparar_datos(df):
+    # Todo el preprocesamiento de PP.py, desde los datos cargados hasta los datos normalizados
+    return normalizar(preparar_caracteristicas(df))
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+
+import joblib
+import pandas as pd
+
+import caracteristicas
+import datos
+import particiones
+import preprocesamiento
+from modelo import MOTOR_POR_DEFECTO, entrenar_seleccion
+
+# Carpeta donde se guardan los modelos entrenados
+DIRECTORIO_MODELOS = os.path.join(datos.DIRECTORIO_CACHE, 'modelos')
+
+# Se incrementa cuando cambia lo que se entrena o se guarda, para no reutilizar modelos antiguos
+VERSION_FORMATO = 3
+
+# Número máximo de modelos en disco; se eliminan primero los usados hace más tiempo
+MAX_MODELOS = 200
+
+# Si una selección solo recibió filas nuevas al final y son menos de esta fracción de sus filas,
+# se sigue usando su modelo anterior en lugar de reentrenarlo
+UMBRAL_REENTRENAMIENTO = 0.05
+
+
+def huella_datos(df):
+    # Hash del contenido del DataFrame (valores e índice), independiente de la sesión
+    valores = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    h = hashlib.sha256(valores.tobytes())
+    h.update(json.dumps([str(c) for c in df.columns]).encode('utf-8'))
+    return h.hexdigest()
+
+
+def huella_esquema(pipeline):
+    # Columnas de salida del pipeline (incluye las categorías de las dummies): si cambian,
+    # cambian las características de todos los modelos
+    contenido = json.dumps([VERSION_FORMATO, caracteristicas.nombres_columnas(pipeline)], ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def huella_particion(df_particion, esquema):
+    # Versión de los datos de una selección: sus filas sin normalizar (df_) y el esquema de columnas.
+    # Las filas nuevas de otras embarcaciones o especies no la cambian, aunque muevan el mínimo o
+    # el máximo de alguna columna (p. ej. un precio del combustible nunca visto)
+    valores = pd.util.hash_pandas_object(df_particion, index=False).to_numpy()
+    h = hashlib.sha256(esquema.encode('utf-8'))
+    h.update(valores.tobytes())
+    return h.hexdigest()
+
+
+def version_seleccion(df, enfoque, seleccion, indice, esquema):
+    columna = particiones.COLUMNA_ENFOQUE[enfoque]
+    return huella_particion(particiones.seleccionar(df, indice, columna, seleccion), esquema)
+
+
+def versiones_particiones(df, indice, esquema):
+    # Versión de cada embarcación y especie, con las claves (enfoque, seleccion)
+    return {(enfoque, seleccion): version_seleccion(df, enfoque, seleccion, indice, esquema)
+            for enfoque, columna in particiones.COLUMNA_ENFOQUE.items()
+            for seleccion in particiones.valores(indice, columna)}
+
+
+def clave_modelo(enfoque, seleccion, version, parametros=None, motor=MOTOR_POR_DEFECTO):
+    # Los modelos con hiperparámetros ajustados o de otro motor se guardan aparte de los de por
+    # defecto (cuya clave no cambia)
+    partes = [VERSION_FORMATO, enfoque, str(seleccion)]
+    if parametros:
+        partes.append(parametros)
+    if motor != MOTOR_POR_DEFECTO:
+        partes.append({'motor': motor})
+    contenido = json.dumps(partes, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return f'{version[:16]}_{hashlib.sha1(contenido).hexdigest()}'
+
+
+def ruta_modelo(clave, directorio=DIRECTORIO_MODELOS):
+    return os.path.join(directorio, f'{clave}.joblib')
+
+
+def cargar_modelo(clave, directorio=DIRECTORIO_MODELOS):
+    ruta = ruta_modelo(clave, directorio)
+    resultado = datos.cargar_joblib(ruta)
+    if resultado is None:
+        return None
+    # Se actualiza la fecha de modificación para llevar el orden LRU
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+    return resultado
+
+
+def guardar_modelo(clave, resultado, directorio=DIRECTORIO_MODELOS, max_modelos=MAX_MODELOS):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = ruta_modelo(clave, directorio)
+    tmp = f'{ruta}.{os.getpid()}.tmp'
+    joblib.dump(resultado, tmp)
+    os.replace(tmp, ruta)
+    invalidar(clave, directorio)
+    podar(max_modelos, directorio)
+
+
+def _por_fecha(rutas, reverse=False):
+    # Ordena por fecha de modificación; otros procesos o hilos pueden borrar archivos entre el
+    # listdir y la lectura de la fecha, así que los que ya no existen se descartan
+    fechas = []
+    for ruta in rutas:
+        try:
+            fechas.append((os.path.getmtime(ruta), ruta))
+        except OSError:
+            continue
+    return [ruta for _, ruta in sorted(fechas, reverse=reverse)]
+
+
+def anteriores(clave, directorio=DIRECTORIO_MODELOS, extension='.joblib'):
+    # Archivos de la misma selección (y parámetros) guardados con otra versión de sus datos,
+    # del más reciente al más antiguo
+    version, sufijo = clave.split('_', 1)
+    try:
+        nombres = os.listdir(directorio)
+    except OSError:
+        return []
+    rutas = [os.path.join(directorio, n) for n in nombres
+             if n.endswith(f'_{sufijo}{extension}') and not n.startswith(f'{version}_')]
+    return _por_fecha(rutas, reverse=True)
+
+
+def invalidar(clave, directorio=DIRECTORIO_MODELOS, extension='.joblib'):
+    # Elimina los modelos de la misma selección entrenados con otra versión de sus datos;
+    # los de las demás selecciones se conservan
+    for ruta in anteriores(clave, directorio, extension):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def podar(max_modelos=MAX_MODELOS, directorio=DIRECTORIO_MODELOS):
+    rutas = [os.path.join(directorio, n) for n in os.listdir(directorio) if n.endswith('.joblib')]
+    if len(rutas) <= max_modelos:
+        return
+    rutas = _por_fecha(rutas)
+    for ruta in rutas[:len(rutas) - max_modelos]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def modelo_reutilizable(df_, enfoque, seleccion, clave, indice, esquema, directorio=DIRECTORIO_MODELOS, umbral=UMBRAL_REENTRENAMIENTO):
+    # Modelo anterior de la selección si sus datos solo crecieron por el final (las filas con las
+    # que se entrenó no cambiaron) y las filas nuevas no superan el umbral. El modelo conserva las
+    # estadísticas de normalización con las que se entrenó
+    rutas = anteriores(clave, directorio)
+    if umbral <= 0 or not rutas:
+        return None
+    anterior = datos.cargar_joblib(rutas[0])
+    if anterior is None:
+        return None
+
+    df_particion = particiones.seleccionar(df_, indice, particiones.COLUMNA_ENFOQUE[enfoque], seleccion)
+    filas = anterior.get('filas', 0)
+    if not 0 < filas <= len(df_particion) or (len(df_particion) - filas) / len(df_particion) > umbral:
+        return None
+    if huella_particion(df_particion.iloc[:filas], esquema) != anterior.get('version'):
+        return None
+    return anterior
+
+
+def obtener_modelo(df, df_, enfoque, seleccion, version=None, directorio=DIRECTORIO_MODELOS, parametros=None, indice=None,
+                   n_jobs=-1, pipeline=None, umbral=UMBRAL_REENTRENAMIENTO, motor=MOTOR_POR_DEFECTO):
+    # Devuelve el modelo de la selección desde el registro, entrenándolo solo si no existe para
+    # esta versión de sus datos (con estos hiperparámetros y motor); version es la de la selección
+    # (version_seleccion), de modo que los datos nuevos de otras selecciones no la invalidan.
+    # df son los datos normalizados con los que se entrena y df_ los mismos sin normalizar
+    if pipeline is None:
+        pipeline = caracteristicas.obtener_pipeline(df, huella_datos(df))
+    if indice is None:
+        indice = particiones.construir_indice(df)
+    esquema = huella_esquema(pipeline)
+    version = version or version_seleccion(df_, enfoque, seleccion, indice, esquema)
+    clave = clave_modelo(enfoque, seleccion, version, parametros, motor)
+    resultado = cargar_modelo(clave, directorio)
+    if resultado is None:
+        resultado = modelo_reutilizable(df_, enfoque, seleccion, clave, indice, esquema, directorio, umbral)
+        if resultado is None:
+            resultado = entrenar_seleccion(df, seleccion, es_embarcacion=(enfoque == "Embarcación"), n_jobs=n_jobs, pipeline=pipeline,
+                                           parametros=parametros, indice=indice, motor=motor)
+            # Versión de los datos con los que se entrenó, para saber después si solo se añadieron
+            # filas, y mínimos y máximos con los que se normalizaron, para predecir con la misma escala
+            resultado['version'] = version
+            resultado['estadisticas'] = preprocesamiento.estadisticas_normalizacion(df_)
+        guardar_modelo(clave, resultado, directorio)
+    return resultado
@@ -0,0 +1,247 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import time
+import unicodedata
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import plotly.express as px
+import plotly.offline
+
+import agregados
+import caracteristicas
+import datos
+import graficos
+import ingesta
+import mapa
+import particiones
+import preprocesamiento
+import registro
+
+from entrenar_todo import selecciones
+
+DIRECTORIO_REPORTES = 'reportes'
+
+# Cambia cuando cambia el contenido de las páginas, para regenerarlas aunque los datos sean los mismos
+VERSION_REPORTE = 1
+
+# Dimensiones por las que se reparten la captura y la ganancia en cada página, según el enfoque
+DESGLOSE = {"Especie": ['Aparejo', 'Embarcacion'], "Embarcación": ['Especie', 'Especie']}
+
+PLANTILLA = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{titulo}</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em; background: #111; color: #eee; }}
+a {{ color: #6cf; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #555; padding: 0.3em 0.8em; text-align: right; }}
+iframe {{ border: none; }}
+</style>
+</head>
+<body>
+{cuerpo}
+</body>
+</html>
+"""
+
+# Datos crudos (para los mapas), características sin normalizar y normalizadas, pipeline, índice de
+# particiones y cubo de agregados de cada proceso del pool (se cargan una sola vez por proceso)
+_df = None
+_df_ = None
+_df_normalized = None
+_pipeline = None
+_indice = None
+_cubo = None
+
+
+def _iniciar_proceso(ruta, version, cubo):
+    global _df, _df_, _df_normalized, _pipeline, _indice, _cubo
+    _df = datos.cargar_datos(ruta)
+    _df_ = preprocesamiento.preparar_caracteristicas(_df)
+    _df_normalized = preprocesamiento.normalizar(_df_)
+    _pipeline = caracteristicas.obtener_pipeline(_df_normalized, version)
+    _indice = particiones.construir_indice(_df_normalized)
+    _cubo = cubo
+
+
+def nombre_archivo(enfoque, seleccion):
+    # Nombre de archivo seguro para la página de una selección (sin tildes, espacios ni barras).
+    # Algunos valores solo se distinguen por espacios (p. ej. 'LISA' y 'LISA '), así que se añade
+    # un resumen del nombre exacto para que cada selección tenga su propia página
+    texto = unicodedata.normalize('NFKD', f'{enfoque}-{seleccion}').encode('ascii', 'ignore').decode()
+    resumen = hashlib.sha1(f'{enfoque}|{seleccion}'.encode('utf-8')).hexdigest()[:6]
+    return f"{re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-')}-{resumen}.html"
+
+
+def _figura(fig):
+    # Las páginas comparten un único plotly.min.js local, para verse sin conexión
+    return fig.to_html(full_html=False, include_plotlyjs=False, default_height='500px')
+
+
+def _pagina(titulo, cuerpo):
+    return PLANTILLA.format(titulo=html.escape(titulo), cuerpo=cuerpo)
+
+
+def _agregados(enfoque, seleccion):
+    # Captura y ganancia de la selección, reagrupando el cubo de agregados (sin volver a los datos)
+    columna = particiones.COLUMNA_ENFOQUE[enfoque]
+    dimension_kilos, dimension_ganancia = DESGLOSE[enfoque]
+    dimensiones = _cubo['dimensiones']
+    dimensiones = dimensiones[dimensiones[columna] == seleccion]
+    kilos = dimensiones.groupby(dimension_kilos, observed=True)['Volumen_Kg'].sum().sort_values().reset_index()
+    ganancia = dimensiones.groupby(dimension_ganancia, observed=True)['Ganancia'].sum().sort_values().reset_index()
+    partes = [
+        px.bar(kilos, x=dimension_kilos, y='Volumen_Kg', title=f'Captura por {dimension_kilos} - {seleccion}',
+               labels={'Volumen_Kg': 'Kilos'}, text_auto=True),
+        px.bar(ganancia, x=dimension_ganancia, y='Ganancia', title=f'Ganancia por {dimension_ganancia} - {seleccion}',
+               labels={'Ganancia': 'Ganancia (Suma Total)'}, color='Ganancia', text='Ganancia'),
+    ]
+    return ''.join(_figura(fig.update_layout(xaxis_tickangle=-45)) for fig in partes)
+
+
+def _seccion_modelo(enfoque, seleccion, version, directorio_modelos):
+    # El modelo se lee del registro; solo se entrena si no existe para esta versión de los datos
+    try:
+        # n_jobs=1: el paralelismo lo pone el pool de procesos
+        resultado = registro.obtener_modelo(_df_normalized, _df_, enfoque, seleccion, version, directorio_modelos, indice=_indice,
+                                            n_jobs=1, pipeline=_pipeline)
+    except ValueError as error:
+        return f'<h2>Modelo</h2><p>{html.escape(str(error))}</p>'
+
+    feature_importances = graficos.importancias(resultado)
+    metricas = resultado['metricas']
+    return ''.join([
+        '<h2>Modelo</h2>',
+        _figura(graficos.figura_curvas(resultado['train_errors'], resultado['val_errors'])),
+        f"<p><b>La característica más influyente es:</b> <code>{html.escape(feature_importances.idxmax())}</code></p>",
+        _figura(graficos.figura_importancias(feature_importances, f'Importancia de Características - {seleccion} ({enfoque})')),
+        _figura(graficos.figura_real_vs_predicho(resultado['y_val'], resultado['y_val_pred'],
+                                                 f'Valores Reales vs Predichos - {seleccion} ({enfoque})')),
+        '<table><tr><th>MSE</th><th>MAE</th><th>R2</th><th>Filas</th></tr>',
+        f"<tr><td>{metricas['mse']:.4f}</td><td>{metricas['mae']:.4f}</td><td>{metricas['r2']:.4f}</td><td>{resultado['filas']}</td></tr></table>",
+    ])
+
+
+def _renderizar(enfoque, seleccion, version, salida, directorio_modelos):
+    inicio = time.perf_counter()
+    archivo = nombre_archivo(enfoque, seleccion)
+    columna = particiones.COLUMNA_ENFOQUE[enfoque]
+    cuerpo = [f'<p><a href="index.html">Índice</a></p><h1>{html.escape(seleccion)} ({enfoque})</h1>']
+
+    # Imagen de la especie, copiada junto a los reportes para que la carpeta sea autónoma
+    imagen = f'resources/{seleccion}.png'
+    if enfoque == "Especie" and os.path.exists(imagen):
+        shutil.copy2(imagen, os.path.join(salida, 'imagenes', archivo.replace('.html', '.png')))
+        cuerpo.append(f'<img src="imagenes/{archivo.replace(".html", ".png")}" alt="{html.escape(seleccion)}" width="400">')
+
+    cuerpo.append(_agregados(enfoque, seleccion))
+
+    # Mapa de orígenes en su propio archivo (folium genera una página completa)
+    with open(os.path.join(salida, 'mapas', archivo), 'w', encoding='utf-8') as f:
+        f.write(mapa.html_mapa(particiones.seleccionar(_df, _indice, columna, seleccion)))
+    cuerpo.append(f'<h2>Orígenes</h2><iframe src="mapas/{archivo}" width="700" height="510"></iframe>')
+
+    cuerpo.append(_seccion_modelo(enfoque, seleccion, version, directorio_modelos))
+
+    with open(os.path.join(salida, archivo), 'w', encoding='utf-8') as f:
+        f.write(_pagina(f'{seleccion} ({enfoque})', ''.join(cuerpo)))
+    return enfoque, seleccion, round(time.perf_counter() - inicio, 3)
+
+
+def _leer_manifiesto(ruta_manifiesto):
+    if not os.path.exists(ruta_manifiesto):
+        return {}
+    with open(ruta_manifiesto, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _escribir_manifiesto(ruta_manifiesto, manifiesto):
+    # Se escribe a un temporal y se renombra, para no dejar un manifiesto a medias si se interrumpe
+    temporal = ruta_manifiesto + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=1, sort_keys=True, ensure_ascii=False)
+    os.replace(temporal, ruta_manifiesto)
+
+
+def _indice_html(vistas, trabajos, version):
+    # Página principal: gráficos generales y enlaces a la página de cada especie y embarcación
+    cuerpo = [f'<h1>Reporte de la actividad pesquera</h1><p>Versión de los datos: <code>{version[:16]}</code></p>',
+              _figura(graficos.figura_captura_especie(vistas['kilos_especie'])),
+              _figura(graficos.figura_ganancia_especie(vistas['ventas_especie']))]
+    for enfoque, titulo in [("Especie", 'Especies'), ("Embarcación", 'Embarcaciones')]:
+        enlaces = ''.join(f'<li><a href="{nombre_archivo(e, s)}">{html.escape(s)}</a></li>' for e, s in trabajos if e == enfoque)
+        cuerpo.append(f'<h2>{titulo}</h2><ul>{enlaces}</ul>')
+    return _pagina('Reporte de la actividad pesquera', ''.join(cuerpo))
+
+
+def generar_reportes(ruta=None, salida=DIRECTORIO_REPORTES, directorio_modelos=registro.DIRECTORIO_MODELOS, procesos=None,
+                     forzar=False):
+    # Cada página depende solo de las filas de su selección: en una nueva ejecución se regeneran
+    # las páginas cuya versión cambió (o que faltan) y las demás se conservan
+    df = datos.cargar_datos(ruta)
+    df_ = preprocesamiento.preparar_caracteristicas(df)
+    df_normalized = preprocesamiento.normalizar(df_)
+    version = registro.huella_datos(df_normalized)
+    indice = particiones.construir_indice(df_normalized)
+    trabajos = selecciones(indice)
+
+    # El pipeline se ajusta aquí una vez y los procesos lo leen de disco; el cubo se lee de los
+    # agregados guardados (sumando solo las filas nuevas) y se envía a cada proceso
+    pipeline = caracteristicas.obtener_pipeline(df_normalized, version)
+    versiones = registro.versiones_particiones(df_, indice, registro.huella_esquema(pipeline))
+    cubo = ingesta.actualizar_agregados(df, ruta)['cubo']
+
+    for carpeta in ['', 'mapas', 'imagenes']:
+        os.makedirs(os.path.join(salida, carpeta), exist_ok=True)
+    ruta_plotly = os.path.join(salida, 'plotly.min.js')
+    if not os.path.exists(ruta_plotly):
+        with open(ruta_plotly, 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+
+    ruta_manifiesto = os.path.join(salida, 'manifiesto.json')
+    manifiesto = {} if forzar else _leer_manifiesto(ruta_manifiesto)
+    firmas = {nombre_archivo(*t): f'{VERSION_REPORTE}:{versiones[t]}' for t in trabajos}
+    pendientes = [t for t in trabajos if manifiesto.get(nombre_archivo(*t)) != firmas[nombre_archivo(*t)]
+                  or not os.path.exists(os.path.join(salida, nombre_archivo(*t)))]
+    print(f"{len(trabajos) - len(pendientes)} páginas sin cambios, {len(pendientes)} por generar")
+
+    with open(os.path.join(salida, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(_indice_html(agregados.vistas(cubo), trabajos, version))
+
+    inicio = time.perf_counter()
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), initializer=_iniciar_proceso,
+                                 initargs=(ruta, version, cubo)) as pool:
+            futuros = [pool.submit(_renderizar, enfoque, seleccion, versiones[(enfoque, seleccion)], salida, directorio_modelos)
+                       for enfoque, seleccion in pendientes]
+            for i, futuro in enumerate(as_completed(futuros), start=1):
+                enfoque, seleccion, segundos = futuro.result()
+                # El manifiesto se actualiza con cada página terminada para poder reanudar
+                manifiesto[nombre_archivo(enfoque, seleccion)] = firmas[nombre_archivo(enfoque, seleccion)]
+                _escribir_manifiesto(ruta_manifiesto, manifiesto)
+                print(f"[{i}/{len(pendientes)}] {enfoque} {seleccion} ({segundos:.1f} s)")
+
+        transcurrido = time.perf_counter() - inicio
+        print(f"{len(pendientes)} páginas en {transcurrido:.1f} s ({len(pendientes) / transcurrido:.2f} páginas/s)")
+    return os.path.join(salida, 'index.html')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera los reportes estáticos (HTML) de todas las especies y embarcaciones.')
+    parser.add_argument('--datos', default=None, help='Archivo de datos (data.xlsx o data.csv)')
+    parser.add_argument('--salida', default=DIRECTORIO_REPORTES, help='Carpeta de los reportes')
+    parser.add_argument('--directorio', default=registro.DIRECTORIO_MODELOS, help='Carpeta de los modelos')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, todos los núcleos)')
+    parser.add_argument('--forzar', action='store_true', help='Regenerar todas las páginas aunque no hayan cambiado')
+    args = parser.parse_args()
+
+    print(generar_reportes(args.datos, args.salida, args.directorio, args.procesos, forzar=args.forzar))
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Frecuencias de agregación disponibles en el tablero
+FRECUENCIAS = {'Diaria': 'D', 'Semanal': 'W-MON', 'Mensual': 'MS'}
+
+# Máximo de puntos que se envían al navegador por serie
+MAX_PUNTOS = 1000
+
+
+def remuestrear(tabla, columna, frecuencia='Diaria'):
+    # Suma la columna por día, semana o mes a partir de la tabla indexada por fecha de faena
+    serie = tabla.set_index('Inicio_Faena')[columna].sort_index()
+    serie = serie.resample(FRECUENCIAS[frecuencia], label='left', closed='left').sum()
+    return serie.reset_index()
+
+
+def lttb(x, y, n_puntos):
+    # Largest-Triangle-Three-Buckets: conserva la forma de la serie eligiendo en cada tramo
+    # el punto que forma el triángulo de mayor área con sus vecinos
+    n = len(x)
+    if n_puntos >= n or n_puntos < 3:
+        return np.arange(n)
+
+    indices = np.empty(n_puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    # Los puntos intermedios se reparten en n_puntos - 2 tramos de igual tamaño
+    cada = (n - 2) / (n_puntos - 2)
+
+    anterior = 0
+    for i in range(n_puntos - 2):
+        inicio, fin = int(i * cada) + 1, int((i + 1) * cada) + 1
+        # Promedio del tramo siguiente (el último punto si ya no quedan tramos)
+        sig_inicio, sig_fin = fin, min(int((i + 2) * cada) + 1, n)
+        x_medio, y_medio = x[sig_inicio:sig_fin].mean(), y[sig_inicio:sig_fin].mean()
+
+        areas = np.abs((x[anterior] - x_medio) * (y[inicio:fin] - y[anterior])
+                       - (x[anterior] - x[inicio:fin]) * (y_medio - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+
+    return indices
+
+
+def reducir(tabla, columna, max_puntos=MAX_PUNTOS):
+    # Reduce la serie a max_puntos como máximo, para que el gráfico no crezca con el historial
+    if len(tabla) <= max_puntos:
+        return tabla
+    x = tabla['Inicio_Faena'].to_numpy().astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    y = tabla[columna].to_numpy(dtype=np.float64)
+    return tabla.iloc[lttb(x, y, max_puntos)].reset_index(drop=True)
+
+
+def serie_para_grafico(tabla, columna, frecuencia='Diaria', max_puntos=MAX_PUNTOS):
+    return reducir(remuestrear(tabla, columna, frecuencia), columna, max_puntos)
+
+
+def agrupar_por_dia(df, columnas):
+    # Sumas por día de faena; es la resolución más fina que necesitan los gráficos de series.
+    # Las medidas se suman en float64 (se guardan en float32)
+    return (df[columnas].astype(np.float64)
+            .groupby(df['Inicio_Faena'].dt.floor('D').rename('Inicio_Faena'), dropna=False).sum().reset_index())
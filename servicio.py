@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import time
+
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+import tornado.web
+
+import caracteristicas
+import datos
+import particiones
+import preprocesamiento
+import registro
+from modelo import MOTOR_POR_DEFECTO, MOTORES
+
+# Columnas de las que se derivan la hora, el mes y los rangos de precio y talla que usa el modelo
+COLUMNAS_DERIVADAS = ['Inicio_Faena', 'Inicio_Venta', 'Precio_Kg', 'Talla_cm']
+
+
+class Predictor:
+    # Modelos del registro de la versión actual de los datos; cada modelo trae las estadísticas de
+    # normalización de los datos con que se entrenó
+
+    def __init__(self, ruta=None, directorio=registro.DIRECTORIO_MODELOS, max_modelos=32, motor=MOTOR_POR_DEFECTO):
+        df = datos.cargar_datos(ruta)
+        df_ = preprocesamiento.eliminar_fechas(preprocesamiento.agregar_caracteristicas(df.copy(deep=False)))
+        df_normalized = preprocesamiento.normalizar(df_)
+        self.pipeline = caracteristicas.obtener_pipeline(df_normalized, registro.huella_datos(df_normalized))
+        # Cada modelo se guarda con la versión de los datos (sin normalizar) de su embarcación o especie
+        self.versiones = registro.versiones_particiones(df_, particiones.construir_indice(df_),
+                                                        registro.huella_esquema(self.pipeline))
+        self.directorio = directorio
+        self.motor = motor
+        # Columnas que debe traer cada registro: las de los datos que el modelo usa tal cual y
+        # aquellas de las que se derivan las demás (sin ellas se predeciría con valores inventados)
+        entradas = [c for nombre, _, columnas in self.pipeline.transformers_ if nombre != 'remainder' for c in columnas]
+        self.requeridas = [c for c in entradas if c in df.columns] + COLUMNAS_DERIVADAS
+        self.max_modelos = max_modelos
+        self._modelos = OrderedDict()
+
+    def modelo(self, enfoque, seleccion):
+        # Los modelos usados se guardan en memoria (LRU) para no leerlos de disco en cada lote
+        clave = registro.clave_modelo(enfoque, seleccion, self.versiones.get((enfoque, seleccion), ''), motor=self.motor)
+        if clave in self._modelos:
+            self._modelos.move_to_end(clave)
+            return self._modelos[clave]
+        resultado = registro.cargar_modelo(clave, self.directorio)
+        if resultado is None:
+            raise KeyError(f"No hay un modelo entrenado para la {'embarcación' if enfoque == 'Embarcación' else 'especie'}: {seleccion}")
+        self._modelos[clave] = resultado
+        if len(self._modelos) > self.max_modelos:
+            self._modelos.popitem(last=False)
+        return resultado
+
+    def preparar(self, registros, columna_enfoque):
+        # Limpieza del formato de data.csv y características derivadas, como en procesar_datos; la
+        # normalización depende del modelo y se hace en matriz
+        if not all(isinstance(r, dict) for r in registros):
+            raise ValueError("cada registro debe ser un objeto JSON")
+        faltantes = [c for c in self.requeridas + [columna_enfoque] if any(c not in r for r in registros)]
+        if faltantes:
+            raise ValueError(f"faltan columnas que usa el modelo: {', '.join(faltantes)}")
+        df = datos.compactar(datos.limpiar_csv(pd.DataFrame.from_records(registros)))
+        df_ = preprocesamiento.eliminar_fechas(preprocesamiento.agregar_caracteristicas(df))
+        # El codificador ignora las categorías que no vio al ajustarse (quedarían igual que la primera,
+        # que se descarta), así que se rechazan en lugar de predecir con ellas
+        codificador = self.pipeline.named_transformers_['categoricas']
+        desconocidas = []
+        for columna, categorias in zip(caracteristicas.COLUMNAS_DUMMIES, codificador.categories_):
+            valores = df_[columna].astype(object)
+            desconocidas += [f"{columna}={v!r}" for v in valores[pd.Index(categorias).get_indexer(valores) < 0].unique()]
+        if desconocidas:
+            raise ValueError(f"valores que el modelo no conoce: {', '.join(desconocidas)}")
+        # Las columnas que el modelo no usa (p. ej. la venta o la ganancia) pueden faltar
+        for columna in self.pipeline.feature_names_in_:
+            if columna not in df_.columns:
+                df_[columna] = np.nan
+        return df_
+
+    def matriz(self, df_, resultado):
+        # Normalización con los mínimos y máximos con que se entrenó el modelo y pipeline de columnas
+        df_normalized = preprocesamiento.normalizar_con_estadisticas(df_, resultado['estadisticas'])
+        if self.motor == 'boosting':
+            return caracteristicas.transformar_categorico(self.pipeline, df_normalized)
+        return caracteristicas.transformar_denso(self.pipeline, df_normalized)
+
+    def volumen_kg(self, prediccion, resultado):
+        # El modelo predice el volumen normalizado; se devuelve en kilos
+        estadisticas = resultado['estadisticas']
+        minimo, maximo = estadisticas.loc['min', 'Volumen_Kg'], estadisticas.loc['max', 'Volumen_Kg']
+        return prediccion * (maximo - minimo) + minimo
+
+
+class Metricas:
+    # Latencias de las últimas peticiones y contadores desde el arranque
+
+    def __init__(self, ventana=10000):
+        self.inicio = time.perf_counter()
+        self.latencias = deque(maxlen=ventana)
+        self.peticiones = 0
+        self.filas = 0
+        self.lotes = 0
+        self.filas_lotes = 0
+
+    def registrar_peticion(self, segundos, filas):
+        self.latencias.append(segundos)
+        self.peticiones += 1
+        self.filas += filas
+
+    def registrar_lote(self, filas):
+        self.lotes += 1
+        self.filas_lotes += filas
+
+    def resumen(self):
+        transcurrido = time.perf_counter() - self.inicio
+        latencias = np.array(self.latencias) * 1000 if self.latencias else np.zeros(1)
+        return {
+            'peticiones': self.peticiones,
+            'filas': self.filas,
+            'lotes': self.lotes,
+            'filas_por_lote': round(self.filas_lotes / self.lotes, 2) if self.lotes else 0,
+            'peticiones_por_segundo': round(self.peticiones / transcurrido, 2),
+            'filas_por_segundo': round(self.filas / transcurrido, 2),
+            'latencia_ms': {f'p{p}': round(float(np.percentile(latencias, p)), 3) for p in (50, 90, 99)},
+        }
+
+
+class Microlotes:
+    # Junta las peticiones que llegan casi a la vez en un solo lote: la transformación y el
+    # predict de cada modelo se hacen una vez por lote en lugar de una vez por petición
+
+    def __init__(self, predictor, metricas, max_espera=0.005, max_filas=4096):
+        self.predictor = predictor
+        self.metricas = metricas
+        self.max_espera = max_espera
+        self.max_filas = max_filas
+        self.cola = asyncio.Queue()
+
+    async def predecir(self, enfoque, registros):
+        futuro = asyncio.get_running_loop().create_future()
+        await self.cola.put((enfoque, registros, futuro))
+        return await futuro
+
+    async def ejecutar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pendientes = [await self.cola.get()]
+            filas = len(pendientes[0][1])
+            limite = loop.time() + self.max_espera
+            while filas < self.max_filas:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    pendientes.append(await asyncio.wait_for(self.cola.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+                filas += len(pendientes[-1][1])
+
+            # El cálculo va a un hilo para no bloquear el bucle de tornado
+            try:
+                resultados, filas_lote = await loop.run_in_executor(None, self._procesar, pendientes)
+            except Exception as error:
+                resultados, filas_lote = [error] * len(pendientes), 0
+            # Solo cuentan los lotes que llegaron a predecir alguna fila
+            if filas_lote:
+                self.metricas.registrar_lote(filas_lote)
+            for (_, _, futuro), resultado in zip(pendientes, resultados):
+                if futuro.done():
+                    continue
+                if isinstance(resultado, Exception):
+                    futuro.set_exception(resultado)
+                else:
+                    futuro.set_result(resultado)
+
+    def _procesar(self, pendientes):
+        # Cada petición se valida y se prepara por separado: un registro no válido solo hace fallar
+        # su propia petición. Las filas válidas de todas se juntan para hacer un predict por modelo
+        resultados = [None] * len(pendientes)
+        tablas, peticiones, enfoques, selecciones = [], [], [], []
+        for i, (enfoque, lista, _) in enumerate(pendientes):
+            columna = particiones.COLUMNA_ENFOQUE[enfoque]
+            try:
+                df_ = self.predictor.preparar(lista, columna)
+            except KeyError as error:
+                resultados[i] = ValueError(f"Registros no válidos: falta o no se reconoce {error}")
+                continue
+            except (ValueError, TypeError) as error:
+                # Los mensajes de pandas traen sugerencias en varias líneas; basta la primera
+                resultados[i] = ValueError(f"Registros no válidos: {str(error).splitlines()[0]}")
+                continue
+            tablas.append(df_)
+            peticiones.extend([i] * len(df_))
+            enfoques.extend([enfoque] * len(df_))
+            selecciones.extend(df_[columna].astype(str))
+
+        if not tablas:
+            return resultados, 0
+        df_ = pd.concat(tablas, ignore_index=True)
+        predicciones = np.full(len(df_), np.nan)
+        peticiones = np.array(peticiones)
+        grupos = pd.Series(np.arange(len(df_))).groupby([enfoques, selecciones]).indices
+        for (enfoque, seleccion), filas in grupos.items():
+            try:
+                resultado = self.predictor.modelo(enfoque, seleccion)
+            except KeyError as error:
+                for i in np.unique(peticiones[filas]):
+                    resultados[i] = error
+                continue
+            try:
+                X = self.predictor.matriz(df_.iloc[filas], resultado)
+            except (ValueError, TypeError) as error:
+                for i in np.unique(peticiones[filas]):
+                    resultados[i] = ValueError(f"Registros no válidos: {str(error).splitlines()[0]}")
+                continue
+            predicciones[filas] = self.predictor.volumen_kg(resultado['modelo'].predict(X), resultado)
+
+        for i in range(len(pendientes)):
+            if resultados[i] is None:
+                resultados[i] = predicciones[peticiones == i].tolist()
+        return resultados, len(df_)
+
+
+class PrediccionHandler(tornado.web.RequestHandler):
+    # POST /predecir con {"enfoque": "Especie", "registros": [{...}, ...]} o {"registro": {...}};
+    # los registros usan las columnas y el formato de data.csv (fechas dd mm YYYY HH:MM, precios
+    # como 3.00 o 'S/3.00') y además Tiempo_Faena, que el modelo usa y solo viene en data.xlsx
+
+    def initialize(self, microlotes, metricas):
+        self.microlotes = microlotes
+        self.metricas = metricas
+
+    def write_error(self, status_code, **kwargs):
+        # Los errores se devuelven como JSON con el mensaje completo
+        error = kwargs.get('exc_info', (None, None, None))[1]
+        if isinstance(error, tornado.web.HTTPError) and error.log_message:
+            # tornado duplica los '%' del mensaje (p. ej. los formatos de fecha); al formatearlo vuelven a ser uno
+            self.finish({'error': error.log_message % error.args})
+        else:
+            self.finish({'error': self._reason})
+
+    async def post(self):
+        inicio = time.perf_counter()
+        try:
+            cuerpo = json.loads(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400, 'El cuerpo no es JSON válido')
+        if not isinstance(cuerpo, dict):
+            raise tornado.web.HTTPError(400, 'El cuerpo debe ser un objeto JSON')
+
+        enfoque = cuerpo.get('enfoque', "Especie")
+        if enfoque not in particiones.COLUMNA_ENFOQUE:
+            raise tornado.web.HTTPError(400, f"Enfoque no válido: {enfoque}")
+        registros = cuerpo.get('registros', cuerpo.get('registro'))
+        if isinstance(registros, dict):
+            registros = [registros]
+        if not registros:
+            raise tornado.web.HTTPError(400, 'No se enviaron registros')
+        if not isinstance(registros, list):
+            raise tornado.web.HTTPError(400, 'Los registros deben ser una lista de objetos JSON')
+
+        try:
+            predicciones = await self.microlotes.predecir(enfoque, registros)
+        except KeyError as error:
+            raise tornado.web.HTTPError(404, error.args[0])
+        except ValueError as error:
+            raise tornado.web.HTTPError(400, str(error))
+
+        self.metricas.registrar_peticion(time.perf_counter() - inicio, len(registros))
+        self.write({'enfoque': enfoque, 'predicciones_kg': predicciones})
+
+
+class MetricasHandler(tornado.web.RequestHandler):
+
+    def initialize(self, metricas):
+        self.metricas = metricas
+
+    def get(self):
+        self.write(self.metricas.resumen())
+
+
+def crear_aplicacion(predictor, max_espera=0.005, max_filas=4096):
+    metricas = Metricas()
+    microlotes = Microlotes(predictor, metricas, max_espera, max_filas)
+    aplicacion = tornado.web.Application([
+        (r'/predecir', PrediccionHandler, {'microlotes': microlotes, 'metricas': metricas}),
+        (r'/metricas', MetricasHandler, {'metricas': metricas}),
+    ])
+    return aplicacion, microlotes
+
+
+async def main(puerto, ruta=None, max_espera=0.005, max_filas=4096, motor=MOTOR_POR_DEFECTO):
+    aplicacion, microlotes = crear_aplicacion(Predictor(ruta, motor=motor), max_espera, max_filas)
+    aplicacion.listen(puerto)
+    print(f"Servicio de predicción en http://localhost:{puerto}/predecir")
+    await microlotes.ejecutar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servicio local de predicción del volumen de captura.')
+    parser.add_argument('--puerto', type=int, default=8888)
+    parser.add_argument('--datos', default=None, help='Archivo de datos (data.xlsx o data.csv)')
+    parser.add_argument('--espera-ms', type=float, default=5, help='Tiempo máximo de espera para completar un lote')
+    parser.add_argument('--max-filas', type=int, default=4096, help='Filas máximas por lote')
+    parser.add_argument('--motor', choices=list(MOTORES), default=MOTOR_POR_DEFECTO,
+                        help='Motor de los modelos (entrenados antes con entrenar_todo.py --motor)')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.puerto, args.datos, args.espera_ms / 1000, args.max_filas, args.motor))
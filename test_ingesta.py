@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+import agregados
+import correlacion
+import datos
+import espacial
+import ingesta
+import preprocesamiento
+
+
+@pytest.fixture(scope='module')
+def df():
+    return datos.cargar_datos()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Los agregados de cada prueba se guardan en una carpeta temporal
+    monkeypatch.setattr(datos, 'DIRECTORIO_CACHE', str(tmp_path))
+    # Filas con las que se actualiza cada cubo
+    sumadas = []
+    original = agregados.actualizar_cubo
+
+    def actualizar_cubo(cubo, df_nuevo):
+        sumadas.append(len(df_nuevo))
+        return original(cubo, df_nuevo)
+
+    monkeypatch.setattr(agregados, 'actualizar_cubo', actualizar_cubo)
+    return sumadas
+
+
+def test_filas_nuevas_se_suman_al_cubo(df, cache):
+    mitad = len(df) // 2
+    ingesta.actualizar_agregados(df.iloc[:mitad])
+    resumen = ingesta.actualizar_agregados(df)
+
+    assert cache == [len(df) - mitad]
+    assert resumen['filas'] == len(df)
+    pd.testing.assert_frame_equal(resumen['cubo']['dimensiones'], agregados.construir_cubo(df)['dimensiones'])
+    pd.testing.assert_frame_equal(resumen['cubo']['tiempo'], agregados.construir_cubo(df)['tiempo'])
+
+
+def test_filas_nuevas_se_suman_al_indice_espacial(df, cache):
+    mitad = len(df) // 2
+    ingesta.actualizar_agregados(df.iloc[:mitad])
+    indice = ingesta.actualizar_agregados(df)['indice']
+    completo = espacial.construir_indice(df)
+
+    pd.testing.assert_frame_equal(indice['celdas'], completo['celdas'])
+    assert espacial.totales(indice, -90, 90, -180, 180) == pytest.approx(espacial.totales(completo, -90, 90, -180, 180))
+
+
+def test_filas_nuevas_se_suman_a_la_correlacion(df, cache):
+    mitad = len(df) // 2
+    ingesta.actualizar_agregados(df.iloc[:mitad])
+    est = ingesta.actualizar_agregados(df)['correlacion']
+    df_ = preprocesamiento.preparar_caracteristicas(df)
+
+    pd.testing.assert_frame_equal(correlacion.matriz(est['Todos']), df_[preprocesamiento.columnas_correlacion].corr())
+    assert set(est['Especie']) == set(df_['Especie'].unique())
+    especie = df_['Especie'].iloc[-1]
+    pd.testing.assert_frame_equal(correlacion.matriz(est['Especie'][especie]),
+                                  correlacion.matriz(correlacion.estadisticas(df_[df_['Especie'] == especie])))
+
+
+def test_sin_filas_nuevas_no_se_recalcula(df, cache):
+    ingesta.actualizar_agregados(df)
+    resumen = ingesta.actualizar_agregados(df)
+
+    assert cache == []
+    assert resumen['filas'] == len(df)
+
+
+def test_filas_editadas_recalculan_el_cubo(df, cache):
+    ingesta.actualizar_agregados(df)
+    editado = df.copy()
+    editado.loc[0, 'Ganancia'] += 100
+    resumen = ingesta.actualizar_agregados(editado)
+
+    assert cache == []
+    pd.testing.assert_frame_equal(resumen['cubo']['dimensiones'], agregados.construir_cubo(editado)['dimensiones'])
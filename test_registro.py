@@ -0,0 +1,95 @@
+import csv
+import os
+
+import pandas as pd
+import pytest
+
+import caracteristicas
+import datos
+import entrenar_todo
+import particiones
+import preprocesamiento
+import registro
+
+EMBARCACION = 'MI PAUL'
+
+
+@pytest.fixture(scope='module')
+def df():
+    return datos.cargar_datos()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Pipelines y modelos de cada prueba en una carpeta temporal
+    monkeypatch.setattr(datos, 'DIRECTORIO_CACHE', str(tmp_path))
+    return str(tmp_path / 'modelos')
+
+
+def con_filas_al_final(df, n):
+    # Los datos con n faenas más de la embarcación al final (copias de las primeras, para que no
+    # aparezcan categorías nuevas y el esquema de columnas no cambie)
+    primeras = df.index[df['Embarcacion'] == EMBARCACION][:n]
+    return pd.concat([df, df.loc[primeras]], ignore_index=True)
+
+
+def obtener(df, directorio):
+    df_ = preprocesamiento.preparar_caracteristicas(df)
+    df_normalized = preprocesamiento.normalizar(df_)
+    pipeline = caracteristicas.obtener_pipeline(df_normalized, registro.huella_datos(df_normalized))
+    indice = particiones.construir_indice(df_normalized)
+    version = registro.version_seleccion(df_, 'Embarcación', EMBARCACION, indice, registro.huella_esquema(pipeline))
+    resultado = registro.obtener_modelo(df_normalized, df_, 'Embarcación', EMBARCACION, version, directorio, indice=indice,
+                                        n_jobs=1, pipeline=pipeline)
+    return resultado, version
+
+
+def test_pocas_filas_nuevas_reutilizan_el_modelo(df, cache):
+    # 3 filas nuevas de 452: por debajo del umbral del 5 %
+    completos = con_filas_al_final(df, 3)
+    anterior, version_anterior = obtener(df, cache)
+    resultado, version = obtener(completos, cache)
+
+    assert version != version_anterior
+    assert resultado['version'] == version_anterior
+    assert resultado['filas'] == anterior['filas']
+    # El modelo reutilizado queda guardado con la versión nueva
+    assert os.path.exists(registro.ruta_modelo(registro.clave_modelo('Embarcación', EMBARCACION, version), cache))
+
+
+def test_muchas_filas_nuevas_reentrenan_el_modelo(df, cache):
+    # 40 filas nuevas de 489: por encima del umbral
+    completos = con_filas_al_final(df, 40)
+    anterior, version_anterior = obtener(df, cache)
+    resultado, version = obtener(completos, cache)
+
+    assert resultado['version'] == version
+    assert resultado['filas'] == anterior['filas'] + 40
+
+
+def leer_metricas(ruta):
+    with open(ruta, newline='', encoding='utf-8') as f:
+        return {(fila['enfoque'], fila['seleccion']): fila for fila in csv.DictReader(f)}
+
+
+def test_metricas_borradas_se_recuperan_del_registro(df, cache, tmp_path, capsys):
+    ruta = str(tmp_path / 'data.xlsx')
+    df[df['Embarcacion'].isin(['JOSUE', 'JUAN PEDRO'])].to_excel(ruta, index=False)
+    ruta_metricas = str(tmp_path / 'metricas.csv')
+
+    entrenar_todo.entrenar_todo(ruta, ruta_metricas, cache, procesos=2)
+    antes = leer_metricas(ruta_metricas)
+    os.remove(ruta_metricas)
+    capsys.readouterr()
+    entrenar_todo.entrenar_todo(ruta, ruta_metricas, cache, procesos=2)
+    despues = leer_metricas(ruta_metricas)
+
+    # Una fila por selección; solo se vuelven a intentar las que fallaron (no tienen modelo)
+    assert despues.keys() == antes.keys()
+    fallidas = [t for t, fila in antes.items() if fila['error']]
+    assert f"{len(antes) - len(fallidas)} selecciones sin cambios" in capsys.readouterr().out
+    for t, fila in antes.items():
+        assert despues[t]['version'] == fila['version']
+        if not fila['error']:
+            assert float(despues[t]['r2']) == pytest.approx(float(fila['r2']), nan_ok=True)
+            assert despues[t]['filas'] == fila['filas']